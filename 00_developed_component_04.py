@@ -1,59 +1,139 @@
 """Adding End user feedback/improvements to final outcome"""
 
-# Import tkinter for GUI, PIL for images, random for choices, reportlab
-# for PDF export
+# Import tkinter for GUI, queue and threading for background work,
+# quiz_assets for images, quiz_data for the region table (names, markers and
+# colours from regions.json), the headless quiz engine for quiz logic,
+# quiz_hitmap for clicks on the map, quiz_pdf for PDF export (reportlab is
+# only loaded on demand), quiz_scheduler for adaptive question order,
+# quiz_store to keep results in SQLite, quiz_events to log interactions,
+# quiz_view to send Tk only the widget options that changed,
+# quiz_watchdog to log event-loop stalls and quiz_trace to time handlers
 import tkinter as tk
-from tkinter import messagebox
-from PIL import Image, ImageTk
-import random
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
+from tkinter import messagebox, ttk
+import os
+import queue
+import threading
+import time
+import quiz_assets
+import quiz_data
+from quiz_engine import QuizEngine, region_ids_in
+import quiz_events
+import quiz_hitmap
+import quiz_pdf
+from quiz_scheduler import SpacedRepetitionScheduler
+import quiz_store
+from quiz_trace import traced
+from quiz_view import WidgetView
+from quiz_watchdog import StallWatchdog
+
+# Import reportlab in the background once the window is shown, so the
+# first export does not wait for it
+PREWARM_PDF_EXPORT = True
+
+# Number of answer options offered for each question
+OPTION_COUNT = 3
+
+# How answers are given: "buttons" offers OPTION_COUNT options to click,
+# "typed" asks for the name in a text box and forgives missing macrons,
+# case, hyphens and small typos
+ANSWER_MODE = "buttons"
+
+# Which way questions go: "forward" asks for the Maori name of a region,
+# "reverse" asks which region has a Maori name, "mixed" asks both ways
+QUESTION_DIRECTION = "forward"
+
+# How answer feedback is shown: "inline" shows a banner over the map that
+# hides itself after FEEDBACK_MS, "modal" pops up a message box
+FEEDBACK_MODE = "inline"
+FEEDBACK_MS = 1500
+
+# Most questions generated ahead of time while feedback is on screen
+PREFETCH_LIMIT = 32
+
+# How the next question is picked: "manual" lets the user click a region on
+# the map, "adaptive" asks the region a spaced-repetition scheduler says is
+# due next, so regions that were missed come back first when playing again
+QUESTION_ORDER = "manual"
+
+# Seed for the quiz's random generators; an integer makes every launch ask
+# the same questions in the same way, None picks a new seed each launch
+QUIZ_SEED = None
+
+# Every click, question, answer and reset is logged to a new file in this
+# folder for each launch (replay with quiz_events.py); None turns it off
+EVENT_LOG_DIR = "event_logs"
+
+# SQLite file sessions and answers are saved to; None turns saving off
+RESULTS_DB = quiz_store.DB_PATH
+
+# Log event-loop lag, and the Python stack whenever the window stops
+# responding for longer than WATCHDOG_STALL_S, to this rotating log file;
+# None turns the watchdog off
+WATCHDOG_LOG = None
+WATCHDOG_STALL_S = 0.25
 
 
 # Main quiz class showing map, questions, and handling quiz logic
 class AotearoaQuiz(object):
     def __init__(self, roots):
-        self.last_user_answer = None
         self.root = roots
         self.root.title("Aotearoa Names Quiz")
         self.root.resizable(False, False)
-
-        # Dictionary mapping regions to their Maori names
-        self.regions = {
-            "Northland": ["Te Tai Tokerau"],
-            "Auckland": ["Tāmaki Makaurau"],
-            "Waikato": ["Waikato"],
-            "Bay of Plenty": ["Te Moana-a-Toitehuatahi"],
-            "Gisborne": ["Tūranganui-a-Kiwa"],
-            "Hawke's Bay": ["Te Matau-a-Māui"],
-            "Taranaki": ["Taranaki"],
-            "Manawatu": ["Manawatū-Whanganui"],
-            "Wellington": ["Te Whanganui-a-Tara"],
-            "Marlborough": ["Te Tauihu-o-te-waka"],
-            "West Coast": ["Te Tai Poutini"],
-            "Canterbury": ["Waitaha"],
-            "Otago": ["Ōtākou"],
-            "Southland": ["Murihiku"]}
-
-        # Initialize variables for buttons, state, answers, and history
-        self.region_buttons = {}
+        self.root.protocol("WM_DELETE_WINDOW", self.close_end_screen)
+
+        # Headless quiz engine holding state, scoring and history
+        self.dataset = quiz_data.load_dataset()
+        scheduler = None
+        if QUESTION_ORDER == "adaptive":
+            scheduler = SpacedRepetitionScheduler(self.dataset.names)
+        self.events = None
+        if EVENT_LOG_DIR:
+            try:
+                os.makedirs(EVENT_LOG_DIR, exist_ok=True)
+                self.events = quiz_events.EventLog(
+                    os.path.join(EVENT_LOG_DIR,
+                                 time.strftime("%Y%m%d-%H%M%S") +
+                                 f"-{os.getpid()}.qlog"),
+                    self.dataset.names)
+            except OSError:
+                pass
+        self.engine = QuizEngine(self.dataset.regions,
+                                 option_count=OPTION_COUNT,
+                                 scheduler=scheduler, events=self.events,
+                                 seed=QUIZ_SEED,
+                                 direction=QUESTION_DIRECTION)
+
+        # Every session and answer is saved to SQLite by a background writer
+        self.store = None
+        self.session_id = None
+        if RESULTS_DB:
+            self.store = quiz_store.ResultsStore(RESULTS_DB)
+            self.session_id = self.store.start_session(
+                self.engine.total_questions)
+
+        # Initialize canvas tags, positions and colours of the region markers
+        self.region_tags = {}
+        self.region_names = []
+        self.marker_positions = {}
         self.original_button_colors = {}
-        self.current_region = None
-        self.correct_answer = None
-        self.answer_buttons = []
-        self.answered_regions = set()
-        self.current_options = []
-        self.quiz_history = []
+
+        # Answered and correct bits the markers were last drawn for
+        self.drawn_state = (0, 0)
+
+        # Labels, answer buttons and markers are updated through the view,
+        # which sends Tk only the options that changed, once per event
+        self.view = WidgetView(self.root)
+
+        # Raster of region IDs for map clicks, loaded once the window is up
+        self.region_raster = None
 
         # Load NZ map image and set window size accordingly
         try:
-            self.nz_image = Image.open("Background Colour Trans.png")
-            self.nz_photo = ImageTk.PhotoImage(self.nz_image)
+            self.nz_photo = quiz_assets.load_photo(
+                "Background Colour Trans.png", self.root)
 
-            image_width = self.nz_image.width
-            image_height = self.nz_image.height
+            image_width = self.nz_photo.width()
+            image_height = self.nz_photo.height()
             extra_width = max(150, 350)
             window_width = max(image_width, extra_width + 100)
             window_height = image_height + 300
@@ -66,20 +146,19 @@ class AotearoaQuiz(object):
             self.root.destroy()
             return
 
-        # Initialize score counters and total question count
-        self.correct_answers = 0
-        self.incorrect_answers = 0
-        self.total_questions = len(self.regions)
-
         # Frame to display score labels
         self.score_frame = tk.Frame(self.root)
         self.score_frame.pack(fill=tk.X)
 
-        # Canvas to display map image
-        self.map_canvas = tk.Canvas(roots, width=self.nz_image.width,
-                                    height=self.nz_image.height)
-        self.map_canvas.create_image(0, 0, image=self.nz_photo,
-                                     anchor=tk.NW)
+        # Canvas as wide as the window so markers beside the coast fit, with
+        # the map image centred on it
+        self.map_canvas = tk.Canvas(roots, width=window_width,
+                                    height=image_height,
+                                    highlightthickness=0)
+        self.map_origin = ((window_width - image_width) // 2, 0)
+        self.map_canvas.create_image(*self.map_origin, image=self.nz_photo,
+                                     anchor=tk.NW, tags="map")
+        self.map_canvas.tag_bind("map", "<Button-1>", self.on_map_click)
         self.map_canvas.pack()
 
         # Frame to hold question and answer buttons
@@ -89,11 +168,30 @@ class AotearoaQuiz(object):
         self.question_label = tk.Label(self.question_frame, text="",
                                        font=("Arial", 16))
         self.question_label.pack()
+        self.view.assume(self.question_label, text="")
 
         # Frame for answer option buttons
         self.options_frame = tk.Frame(self.question_frame)
         self.options_frame.pack()
 
+        # Fixed pool of answer buttons, reconfigured for every question
+        # instead of being destroyed and created again
+        self.answer_buttons = []
+        for index in range(OPTION_COUNT):
+            answer_button = tk.Button(self.options_frame, font=("Arial", 12),
+                                      command=lambda i=index:
+                                      self.choose_option(i))
+            self.answer_buttons.append(answer_button)
+
+        # Text box and submit button for typed answers
+        self.answer_entry = tk.Entry(self.options_frame, font=("Arial", 14))
+        self.answer_entry.bind("<Return>",
+                               lambda event: self.submit_typed_answer())
+        self.submit_button = tk.Button(self.options_frame,
+                                       text="Submit Answer",
+                                       font=("Arial", 12),
+                                       command=self.submit_typed_answer)
+
         # Frame and button to close current question view
         self.close_button_frame = tk.Frame(self.question_frame)
         self.close_button_frame.pack(pady=5)
@@ -106,25 +204,54 @@ class AotearoaQuiz(object):
         self.close_button.pack()
         self.close_button.pack_forget()  # Hide initially
 
+        # Banner over the top of the map for inline answer feedback
+        self.feedback_label = tk.Label(self.root, font=("Arial", 11),
+                                       fg="white", padx=10, pady=4)
+        self.feedback_hide_job = None
+
         # Labels showing correct and incorrect counts
         self.correct_label = tk.Label(self.score_frame,
-                                      text=f"Correct: {self.correct_answers}",
+                                      text="Correct: 0",
                                       font=("Arial", 10))
         self.correct_label.pack(side=tk.LEFT, padx=10, pady=5)
+        self.view.assume(self.correct_label, text="Correct: 0")
 
         separator = tk.Label(self.score_frame, text=" | ", font=("Arial", 10))
         separator.pack(side=tk.LEFT)
 
         self.incorrect_label = tk.Label(
-            self.score_frame, text=f"Incorrect: {self.incorrect_answers}",
+            self.score_frame, text="Incorrect: 0",
             font=("Arial", 10))
         self.incorrect_label.pack(side=tk.LEFT)
+        self.view.assume(self.incorrect_label, text="Incorrect: 0")
+
+        # Draw clickable markers on map for each region
+        self.create_region_buttons_on_map()
+        self.view.assume_item(self.map_canvas, "region", state=tk.NORMAL)
 
-        # Load and place logo image if available
+        self.end_screen = None
+        self.export_thread = None
+        self.export_results = queue.Queue()
+
+        self.root.after_idle(self.load_logo)
+        self.root.after_idle(self.load_region_raster)
+        if ANSWER_MODE == "typed":
+            self.root.after_idle(self.load_answer_index)
+        if PREWARM_PDF_EXPORT:
+            self.root.after_idle(quiz_pdf.prewarm_reportlab)
+        self.root.after_idle(self.ask_next_region)
+
+        self.watchdog = None
+        if WATCHDOG_LOG:
+            self.watchdog = StallWatchdog(self.root, WATCHDOG_LOG,
+                                          threshold_s=WATCHDOG_STALL_S)
+            self.watchdog.start()
+
+    # Load and place logo image if available, after the main window is up
+    def load_logo(self):
         try:
-            self.logo_image = Image.open(
-                "HenyDice Logo Trans.png")
-            self.logo_photo = ImageTk.PhotoImage(self.logo_image)
+            self.logo_photo = quiz_assets.load_photo(
+                "HenyDice Logo Trans.png", self.root)
             self.logo_label = tk.Label(self.root, image=self.logo_photo)
             self.logo_label.place(relx=1.0, rely=1.0, x=-10, anchor='se')
 
@@ -132,231 +259,299 @@ class AotearoaQuiz(object):
             messagebox.showwarning("Warning",
                                    "Logo image not found!")
 
-        # Create buttons on map for each region
-        self.create_region_buttons_on_map()
-
-        self.end_screen = None
-
     # Close current question, remove answer buttons, re-enable region buttons
+    @traced
     def close_current_question(self):
-        if self.current_region:
-            self.question_label.config(text="")
-            for button in self.answer_buttons:
-                button.destroy()
-            self.answer_buttons = []
+        if self.engine.current_region:
+            self.view.configure(self.question_label, text="")
+            self.hide_answer_buttons()
             self.close_button.pack_forget()
 
-            for name, button in self.region_buttons.items():
-                if name not in self.answered_regions:
-                    button.config(state=tk.NORMAL)
-
-            self.current_region = None
-            self.correct_answer = None
-            self.current_options = []
-
-    # Update score counters and show info dialogs accordingly
-    def update_score(self, correct=True):
-        if self.current_region and self.correct_answer:
-            self.quiz_history.append({
-                "region": self.current_region,
-                "correct_answer": self.correct_answer,
-                "user_answer": self.last_user_answer,
-                "correct": correct
-            })
-        if correct:
-            self.correct_answers += 1
-            messagebox.showinfo(message=f"{self.correct_answer} "
-                                        f"was the correct answer for "
-                                        f"{self.current_region}",
-                                title="Correct!")
-            self.correct_label.config(text=f"Correct: {self.correct_answers}")
+            self.enable_markers()
+            self.engine.close_question()
+
+    # Update score labels and show info dialogs for the last answer
+    @traced
+    def update_score(self, entry):
+        if entry["correct"]:
+            self.show_feedback(f"{entry['correct_answer']} was the correct "
+                               f"answer for {entry['prompt']}",
+                               "Correct!", True)
+            self.view.configure(
+                self.correct_label,
+                text=f"Correct: {self.engine.correct_answers}")
         else:
-            self.incorrect_answers += 1
-            messagebox.showerror(
-                message=f"That was not the correct answer for "
-                        f"{self.current_region}. The correct "
-                        f"answer was {self.correct_answer}",
-                title="Incorrect!")
-            self.incorrect_label.config(
-                text=f"Incorrect: {self.incorrect_answers}")
-
-    # Add buttons on map for each region at approx positions with colors
+            self.show_feedback(f"That was not the correct answer for "
+                               f"{entry['prompt']}. The correct answer "
+                               f"was {entry['correct_answer']}",
+                               "Incorrect!", False)
+            self.view.configure(
+                self.incorrect_label,
+                text=f"Incorrect: {self.engine.incorrect_answers}")
+
+    # Show answer feedback as a message box, or as a banner that hides
+    # itself without blocking the quiz while the next questions are prepared
+    def show_feedback(self, message, title, correct):
+        if FEEDBACK_MODE == "modal":
+            if correct:
+                messagebox.showinfo(message=message, title=title)
+            else:
+                messagebox.showerror(message=message, title=title)
+            return
+
+        self.feedback_label.config(text=f"{title} {message}",
+                                   bg="green" if correct else "red",
+                                   wraplength=self.map_canvas.winfo_width())
+        self.feedback_label.place(in_=self.map_canvas, relx=0.5, y=4,
+                                  anchor=tk.N)
+        self.feedback_label.lift()
+        if self.feedback_hide_job is not None:
+            self.root.after_cancel(self.feedback_hide_job)
+        self.feedback_hide_job = self.root.after(FEEDBACK_MS,
+                                                 self.hide_feedback)
+        self.root.after_idle(lambda: self.engine.prefetch(
+            self.engine.available_regions()[:PREFETCH_LIMIT]))
+
+    # Hide the inline feedback banner
+    def hide_feedback(self):
+        self.feedback_hide_job = None
+        self.feedback_label.place_forget()
+
+    # Draw a marker on the map canvas for each region at the position and
+    # colour given in the region dataset. Every marker item carries the
+    # "region" tag so all of them can be enabled or disabled with a single
+    # itemconfig call.
+    @traced
     def create_region_buttons_on_map(self):
-        button_configuration = {"width": 10, "height": 1, "font": ("Arial", 8)}
-        button_colors = {
-            "Northland": 'tan1',
-            "Auckland": 'lightgreen',
-            "Waikato": 'gold1',
-            "Bay of Plenty": 'royalblue1',
-            "Gisborne": 'tan1',
-            "Hawke's Bay": 'lightgreen',
-            "Taranaki": 'royalblue1',
-            "Manawatu": 'mediumpurple1',
-            "Wellington": 'gold1',
-            "Marlborough": 'lightgreen',
-            "West Coast": 'gold1',
-            "Canterbury": 'royalblue1',
-            "Otago": 'lightgreen',
-            "Southland": 'tan1'
-        }
-
-        # Create buttons for each region at specific x,y on map
-        self.create_map_button("Northland", 240, 80,
-                               **button_configuration,
-                               bg=button_colors["Northland"])
-        self.create_map_button("Auckland", 265, 115,
-                               **button_configuration,
-                               bg=button_colors["Auckland"])
-        self.create_map_button("Waikato", 270, 150,
-                               **button_configuration,
-                               bg=button_colors["Waikato"])
-        self.create_map_button("Bay of Plenty", 400, 115,
-                               **button_configuration,
-                               bg=button_colors["Bay of Plenty"])
-        self.create_map_button("Gisborne", 450, 165,
-                               **button_configuration,
-                               bg=button_colors["Gisborne"])
-        self.create_map_button("Hawke's Bay", 420, 210,
-                               **button_configuration,
-                               bg=button_colors["Hawke's Bay"])
-        self.create_map_button("Taranaki", 260, 185,
-                               **button_configuration,
-                               bg=button_colors["Taranaki"])
-        self.create_map_button("Manawatu", 405, 240,
-                               **button_configuration,
-                               bg=button_colors["Manawatu"])
-        self.create_map_button("Wellington", 380, 270,
-                               **button_configuration,
-                               bg=button_colors["Wellington"])
-        self.create_map_button("Marlborough", 220, 230,
-                               **button_configuration,
-                               bg=button_colors["Marlborough"])
-        self.create_map_button("West Coast", 190, 280,
-                               **button_configuration,
-                               bg=button_colors["West Coast"])
-        self.create_map_button("Canterbury", 330, 310,
-                               **button_configuration,
-                               bg=button_colors["Canterbury"])
-        self.create_map_button("Otago", 280, 380,
-                               **button_configuration,
-                               bg=button_colors["Otago"])
-        self.create_map_button("Southland", 125, 340,
-                               **button_configuration,
-                               bg=button_colors["Southland"])
-
-    # Helper to create a button for a region with click event
-    def create_map_button(self, region_name, x, y, **kwargs):
-        button = tk.Button(self.root, text=region_name, **kwargs,
-                           command=lambda r=region_name:
-                           self.show_question(r))
-        button.place(x=x - kwargs.get("width", 8) * 6, y=y, anchor=tk.CENTER)
-        self.region_buttons[region_name] = button
-        self.original_button_colors[region_name] = kwargs.get(
-            'bg')  # Store original color
+        # Positions were measured on the window, so move them up by the
+        # height of the score bar above the canvas
+        self.score_frame.update_idletasks()
+        y_offset = self.score_frame.winfo_reqheight()
+
+        for index, region_name in enumerate(self.dataset.names):
+            x, y = self.dataset.markers[region_name]
+            self.create_map_button(region_name, index, x - 60, y - y_offset,
+                                   self.dataset.colors[region_name])
+
+    # Helper to draw a region marker (box and label) with a click event
+    def create_map_button(self, region_name, index, x, y, color):
+        tag = f"region{index}"
+        self.map_canvas.create_rectangle(
+            x - 40, y - 10, x + 40, y + 10, fill=color, outline="gray30",
+            tags=("region", "marker", tag))
+        self.map_canvas.create_text(
+            x, y, text=region_name, font=("Arial", 8), fill="black",
+            disabledfill="gray45", tags=("region", "label", tag))
+        self.view.assume_item(self.map_canvas, f"{tag}&&marker", fill=color)
+        self.view.assume_item(self.map_canvas, f"{tag}&&label", fill="black",
+                              disabledfill="gray45")
+        self.map_canvas.tag_bind(tag, "<Button-1>",
+                                 lambda event, r=region_name:
+                                 self.on_region_click(r))
+        self.region_tags[region_name] = tag
+        self.region_names.append(region_name)
+        self.marker_positions[region_name] = (x, y)
+        self.original_button_colors[region_name] = color
+
+    # Decode (or load from cache) the region raster in a background thread
+    # so a click anywhere on a region selects it. Without NumPy and PIL, or
+    # if the map cannot be decoded, the markers still work on their own.
+    def load_region_raster(self):
+        origin_x, origin_y = self.map_origin
+        markers = [(x - origin_x, y - origin_y)
+                   for x, y in self.marker_positions.values()]
+        colors = list(self.original_button_colors.values())
+
+        def load():
+            try:
+                self.region_raster = quiz_hitmap.load_region_raster(
+                    "Background Colour Trans.png", markers, colors)
+            except (ImportError, OSError, KeyError, ValueError):
+                pass
+
+        threading.Thread(target=load, name="region-raster",
+                         daemon=True).start()
+
+    # Build the indexes typed answers are matched against in a background
+    # thread, so the first answer does not wait for them
+    def load_answer_index(self):
+        def load():
+            self.engine.get_answer_index()
+            if QUESTION_DIRECTION != "forward":
+                self.engine.get_region_index()
+
+        threading.Thread(target=load, name="answer-index",
+                         daemon=True).start()
+
+    # Open the question for the region under a click on the map image
+    def on_map_click(self, event):
+        if self.region_raster is None or self.engine.current_region:
+            return
+        region_id = quiz_hitmap.region_at(
+            self.region_raster, event.x - self.map_origin[0],
+            event.y - self.map_origin[1])
+        if region_id < 0:
+            return
+        region = self.region_names[region_id]
+        if not self.engine.is_answered(region):
+            self.on_region_click(region)
+
+    # Log a click on a region (marker or map) and ask its question. Answered
+    # markers stay enabled, and a click can arrive before the view disables
+    # the markers, so both are ignored here.
+    @traced
+    def on_region_click(self, region):
+        if self.engine.current_region or self.engine.is_answered(region):
+            return
+        if self.events is not None:
+            self.events.click(region)
+        self.show_question(region)
+
+    # Enable the markers again (answered ones ignore clicks)
+    def enable_markers(self):
+        self.view.itemconfigure(self.map_canvas, "region", state=tk.NORMAL)
 
     def _handle_answer_selection(self, user_answer):
         self.check_answer(user_answer)
 
-    # Show question for selected region with shuffled answer options
-    def show_question(self, region):
-        self.current_region = region
-        correct_maori_names = self.regions[region]
-        self.correct_answer = random.choice(correct_maori_names)
-        incorrect_options = set()
-        all_maori_names = [name for sublist in self.regions.values() for name
-                           in sublist]
-
-        while len(incorrect_options) < 2:
-            wrong_answer = random.choice(all_maori_names)
-            if wrong_answer not in correct_maori_names:
-                incorrect_options.add(wrong_answer)
+    # Answer with the option shown on the pooled button that was clicked
+    def choose_option(self, index):
+        if index < len(self.engine.current_options):
+            self.check_answer(self.engine.current_options[index])
 
-        options = list(incorrect_options) + [self.correct_answer]
-        random.shuffle(options)
-
-        question_text = f"What is the Maori name for {region}?"
-        self.question_label.config(text=question_text)
-
-        # Remove previous answer buttons
+    # Hide every pooled answer button
+    def hide_answer_buttons(self):
         for button in self.answer_buttons:
-            button.destroy()
-        self.answer_buttons = []
+            button.pack_forget()
+        self.answer_entry.pack_forget()
+        self.submit_button.pack_forget()
 
-        # Create buttons for answer options
-        for option in options:
-            answer_button = tk.Button(self.options_frame, text=option,
-                                      font=("Arial", 12),
-                                      command=lambda ans=option:
-                                      self.check_answer(ans))
-            answer_button.pack(pady=5)
-            self.answer_buttons.append(answer_button)
+    # Answer with the text typed into the answer box
+    def submit_typed_answer(self):
+        if self.engine.current_region:
+            self.check_answer(self.answer_entry.get(), typed=True)
+
+    # Show question for selected region with shuffled answer options
+    @traced
+    def show_question(self, region):
+        options = self.engine.show_question(region)
+        self.view.configure(self.question_label,
+                            text=self.engine.question_text())
+
+        if ANSWER_MODE == "typed":
+            # Clear the answer box and put the cursor in it
+            self.answer_entry.delete(0, tk.END)
+            self.answer_entry.pack(pady=5)
+            self.submit_button.pack(pady=5)
+            self.answer_entry.focus_set()
+        else:
+            # Show a pooled button for each option and hide any spare ones
+            for index, button in enumerate(self.answer_buttons):
+                if index < len(options):
+                    self.view.configure(button, text=options[index])
+                    button.pack(pady=5)
+                else:
+                    button.pack_forget()
 
         self.close_button.pack()
 
-        # Disable all region buttons while answering
-        for name, button in self.region_buttons.items():
-            button.config(state=tk.DISABLED)
-
-    # Check user's answer and update UI and score accordingly
-    def check_answer(self, user_answer):
-        self.last_user_answer = user_answer
-        if self.current_region:
-            region_button = self.region_buttons.get(self.current_region)
-
-            if user_answer == self.correct_answer:
-                self.update_score(True)
-                if region_button:
-                    region_button.config(bg="green",
-                                         disabledforeground="white")
+        # Disable all region markers while answering
+        self.view.itemconfigure(self.map_canvas, "region", state=tk.DISABLED)
+
+    # Check user's answer (clicked, or typed when typed is True) and update
+    # UI and score accordingly
+    @traced
+    def check_answer(self, user_answer, typed=False):
+        region = self.engine.current_region
+        if region:
+            if typed:
+                self.engine.check_typed_answer(user_answer)
             else:
-                self.update_score(False)
-                if region_button:
-                    region_button.config(bg="red",
-                                         disabledforeground="white")
-
-            self.question_label.config(text="")
+                self.engine.check_answer(user_answer)
+            entry = self.engine.quiz_history[-1]
+            if self.store is not None:
+                self.store.record_answer(self.session_id, entry)
+            self.update_score(entry)
+            self.refresh_markers()
 
-            for button in self.answer_buttons:
-                button.destroy()
-            self.answer_buttons = []
+            self.view.configure(self.question_label, text="")
+            self.hide_answer_buttons()
 
-            self.answered_regions.add(self.current_region)
-            if len(self.answered_regions) == self.total_questions:
+            if self.engine.is_finished():
                 self.finish_quiz()
-            elif region_button:
-                region_button.config(state=tk.DISABLED)
 
-            for name, button in self.region_buttons.items():
-                if name not in self.answered_regions:
-                    button.config(state=tk.NORMAL)
+            self.enable_markers()
 
-            self.current_region = None
-            self.correct_answer = None
             self.close_button.pack_forget()
+            self.ask_next_region()
+
+    # Recolour only the markers whose answered or correct bit changed since
+    # they were last drawn: green or red once answered, their own colour
+    # again after a reset. The view sends the colours with the rest of the
+    # event's changes.
+    def refresh_markers(self):
+        answered, correct = self.engine.snapshot()
+        drawn_answered, drawn_correct = self.drawn_state
+        changed = (answered ^ drawn_answered) | (correct ^ drawn_correct)
+        for region_id in region_ids_in(changed):
+            name = self.region_names[region_id]
+            tag = self.region_tags[name]
+            if answered >> region_id & 1:
+                self.view.itemconfigure(
+                    self.map_canvas, f"{tag}&&marker",
+                    fill="green" if correct >> region_id & 1 else "red")
+                self.view.itemconfigure(self.map_canvas, f"{tag}&&label",
+                                        fill="white", disabledfill="white")
+            else:
+                self.view.itemconfigure(
+                    self.map_canvas, f"{tag}&&marker",
+                    fill=self.original_button_colors[name])
+                self.view.itemconfigure(self.map_canvas, f"{tag}&&label",
+                                        fill="black", disabledfill="gray45")
+        self.drawn_state = (answered, correct)
+
+    # In adaptive order, ask the region the scheduler says is due next
+    def ask_next_region(self):
+        if (self.engine.scheduler is not None
+                and not self.engine.is_finished()
+                and not self.engine.current_region):
+            self.show_question(self.engine.next_region())
 
     # Show final quiz results and options to export, replay or close
+    @traced
     def finish_quiz(self):
-        accuracy = (self.correct_answers / self.total_questions) * 100
-        final_score_message = (f"The Quiz Is Finished!\n"
-                               f"Correct Answers: {self.correct_answers}\n"
-                               f"Incorrect Answers: {self.incorrect_answers}\n"
-                               f"Percentage: {accuracy:.2f}%")
+        if self.store is not None:
+            self.store.finish_session(self.session_id,
+                                      self.engine.correct_answers,
+                                      self.engine.incorrect_answers,
+                                      state=self.engine.state_key())
+        final_score_message = (
+            f"The Quiz Is Finished!\n"
+            f"Correct Answers: {self.engine.correct_answers}\n"
+            f"Incorrect Answers: {self.engine.incorrect_answers}\n"
+            f"Percentage: {self.engine.accuracy():.2f}%")
 
         if self.end_screen is None:
             self.end_screen = tk.Toplevel(self.root)
             self.end_screen.title("Quiz Finished")
             self.end_screen.resizable(False, False)
 
-            message_label = tk.Label(self.end_screen, text=final_score_message,
-                                     font=("Arial", 10))
-            message_label.pack(padx=25, pady=25)
+            self.end_message_label = tk.Label(self.end_screen,
+                                              text=final_score_message,
+                                              font=("Arial", 10))
+            self.end_message_label.pack(padx=25, pady=25)
 
-            export_button_end = tk.Button(self.end_screen,
-                                          text="Export Results to PDF",
-                                          font=("Arial", 10), bg="blue",
-                                          fg='white',
-                                          command=self.export_results_pdf)
-            export_button_end.pack(pady=5)
+            self.export_button = tk.Button(self.end_screen,
+                                           text="Export Results to PDF",
+                                           font=("Arial", 10), bg="blue",
+                                           fg='white',
+                                           command=self.export_results_pdf)
+            self.export_button.pack(pady=5)
+
+            # Progress bar shown while a PDF export runs in the background
+            self.export_progress = ttk.Progressbar(self.end_screen,
+                                                   mode="indeterminate",
+                                                   length=160)
 
             play_again_button = tk.Button(self.end_screen, text="Play Again",
                                           font=("Arial", 10), bg="green",
@@ -371,71 +566,91 @@ class AotearoaQuiz(object):
 
         else:
             # Update and bring end screen to front if already exists
-            for widget in self.end_screen.winfo_children():
-                if isinstance(widget, tk.Label):
-                    widget.config(text=final_score_message)
+            self.end_message_label.config(text=final_score_message)
             self.end_screen.lift()
 
     # Reset quiz data, scores, buttons and close end screen if open
+    @traced
     def reset_quiz(self):
-        self.correct_answers = 0
-        self.incorrect_answers = 0
-        self.answered_regions = set()
-        self.quiz_history = []
-        self.correct_label.config(text=f"Correct: {self.correct_answers}")
-        self.incorrect_label.config(
-            text=f"Incorrect: {self.incorrect_answers}")
-
-        for name, button in self.region_buttons.items():
-            original_color = self.original_button_colors.get(name)
-            if original_color:
-                button.config(state=tk.NORMAL, bg=original_color)
+        self.engine.reset()
+        if self.store is not None:
+            self.session_id = self.store.start_session(
+                self.engine.total_questions)
+        self.view.configure(self.correct_label,
+                            text=f"Correct: {self.engine.correct_answers}")
+        self.view.configure(
+            self.incorrect_label,
+            text=f"Incorrect: {self.engine.incorrect_answers}")
+
+        self.refresh_markers()
+        self.enable_markers()
 
         if self.end_screen:
             self.end_screen.destroy()
             self.end_screen = None
 
-    # Export quiz results to PDF file with summary and detailed answers
+        self.ask_next_region()
+
+    # Export quiz results to PDF in a worker thread so the window stays
+    # responsive; clicks while an export is running are ignored
+    @traced
     def export_results_pdf(self):
-        filename = "quiz_results.pdf"
-        doc = SimpleDocTemplate(filename, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        title = Paragraph("Aotearoa Names Quiz Results", styles['h1'])
-        story.append(title)
-        story.append(Spacer(1, 0.2 * inch))
-
-        summary = Paragraph(
-            f"Final Score: Correct Answers: {self.correct_answers}, "
-            f"Incorrect Answers: {self.incorrect_answers}, "
-            f"Percentage: "
-            f"{(self.correct_answers / self.total_questions) * 100:.2f}%",
-            styles['Normal'])
-        story.append(summary)
-        story.append(Spacer(1, 0.2 * inch))
-
-        story.append(Paragraph("Detailed Results:", styles['h2']))
-        for entry in self.quiz_history:
-            text = (f"Region: {entry['region']}, Correct Answer: "
-                    f"{entry['correct_answer']}, User Answer: "
-                    f"{entry['user_answer']}, "
-                    f"{'Correct' if entry['correct'] else 'Incorrect'}")
-            story.append(Paragraph(text, styles['Normal']))
-            story.append(Spacer(1, 0.1 * inch))
+        if self.export_thread is not None:
+            return
 
+        filename = "quiz_results.pdf"
+        args = (filename, self.engine.correct_answers,
+                self.engine.incorrect_answers, self.engine.accuracy(),
+                list(self.engine.quiz_history))
+
+        def export():
+            try:
+                quiz_pdf.write_results_pdf(*args)
+                self.export_results.put((True, filename))
+            except Exception as e:
+                self.export_results.put((False, str(e)))
+
+        self.export_thread = threading.Thread(target=export,
+                                              name="pdf-export", daemon=True)
+        self.export_thread.start()
+        if self.end_screen:
+            self.export_button.config(state=tk.DISABLED,
+                                      text="Exporting...")
+            self.export_progress.pack(pady=5, after=self.export_button)
+            self.export_progress.start(10)
+        self.root.after(50, self.poll_export)
+
+    # Check on the export thread from the Tk event loop and report when done
+    def poll_export(self):
         try:
-            doc.build(story)
+            succeeded, detail = self.export_results.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self.poll_export)
+            return
+
+        self.export_thread = None
+        if self.end_screen:
+            self.export_progress.stop()
+            self.export_progress.pack_forget()
+            self.export_button.config(state=tk.NORMAL,
+                                      text="Export Results to PDF")
+        if succeeded:
             messagebox.showinfo("Export Successful",
-                                f"Results exported to {filename}")
-        except Exception as e:
+                                f"Results exported to {detail}")
+        else:
             messagebox.showerror("Export Failed",
-                                 f"Error exporting PDF: {str(e)}")
+                                 f"Error exporting PDF: {detail}")
 
     # Close end screen window
     def close_end_screen(self):
         if self.end_screen:
             self.end_screen.destroy()
+        if self.store is not None:
+            self.store.close()
+        if self.events is not None:
+            self.events.close()
+        if self.watchdog is not None:
+            self.watchdog.stop()
         self.root.destroy()
 
 
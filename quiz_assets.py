@@ -0,0 +1,45 @@
+"""quiz_assets loads images straight into Tk. PNGs are decoded by Tk 8.6's
+native PhotoImage; anything Tk cannot read is converted once with PIL and
+kept in a content-hashed cache, so PIL is not imported on normal launches."""
+
+# Import hashlib and os for the cache, tkinter for PhotoImage
+import hashlib
+import os
+import tkinter as tk
+
+CACHE_DIR = ".asset_cache"
+
+# Format converted images are cached in (Tk 8.5 only reads GIF natively)
+CACHE_FORMAT = "png" if tk.TkVersion >= 8.6 else "gif"
+
+
+# Load an image file as a Tk PhotoImage, using the cache for formats Tk
+# cannot decode itself (e.g. JPEG)
+def load_photo(path, master=None):
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    try:
+        return tk.PhotoImage(file=path, master=master)
+    except tk.TclError:
+        return tk.PhotoImage(file=cached_copy(path), master=master)
+
+
+# Path of a Tk-readable copy of an image, converting it with PIL the first
+# time this exact file content is seen
+def cached_copy(path, cache_dir=CACHE_DIR):
+    with open(path, "rb") as image_file:
+        key = hashlib.sha1(image_file.read()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(cache_dir, f"{stem}.{key}.{CACHE_FORMAT}")
+    if os.path.exists(cache_path):
+        return cache_path
+
+    from PIL import Image
+
+    os.makedirs(cache_dir, exist_ok=True)
+    partial_path = cache_path + ".part"
+    with Image.open(path) as image:
+        image = image.convert("RGBA" if CACHE_FORMAT == "png" else "P")
+        image.save(partial_path, format=CACHE_FORMAT.upper())
+    os.replace(partial_path, cache_path)
+    return cache_path
@@ -0,0 +1,756 @@
+"""quiz_bench measures the Aotearoa quiz. Run it with the names of
+benchmarks, e.g. ``python quiz_bench.py startup stages``; results are
+printed and saved as JSON under bench_results/ so stages and runs can be
+compared. Benchmarks that open a window need a display (a virtual X server
+such as ``xvfb-run python quiz_bench.py stages`` works); ``engine`` runs
+headless."""
+
+# Import helpers for timing, subprocesses, JSON and loading stage scripts
+import argparse
+import glob
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_SCRIPT = "00_developed_component_04.py"
+RESULTS_DIR = os.path.join(HERE, "bench_results")
+
+# Old top-level imports of the final stage, used to compare eager loading
+EAGER_REPORTLAB = ("import reportlab.lib.pagesizes, reportlab.platypus, "
+                   "reportlab.lib.styles, reportlab.lib.units")
+
+# Code run in a fresh interpreter to time how long the first frame takes
+STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+{preload}
+import tkinter as tk
+import quiz_bench
+module = quiz_bench.load_stage({script!r})
+quiz_bench.isolate_stage(module)
+module.PREWARM_PDF_EXPORT = False
+root = tk.Tk()
+app = module.AotearoaQuiz(root)
+root.update()
+print(time.perf_counter() - start)
+root.destroy()
+"""
+
+
+# Load a stage script (whose file name is not a module name) as a module
+def load_stage(filename):
+    path = os.path.join(HERE, filename)
+    name = "stage_" + os.path.splitext(os.path.basename(filename))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Keep a benchmarked stage away from the classroom's saved results and
+# event logs (stages from before these settings ignore them)
+def isolate_stage(module):
+    module.RESULTS_DB = None
+    module.EVENT_LOG_DIR = None
+
+
+# All stage scripts, in the order they were developed
+def stage_scripts():
+    stages = sorted(os.path.basename(path)
+                    for path in glob.glob(os.path.join(HERE, "0*_*.py")))
+    # The 00_developed_component stages came after 03_completion
+    return ([name for name in stages if not name.startswith("00_")] +
+            [name for name in stages if name.startswith("00_")])
+
+
+# Run a snippet in a fresh interpreter and return the number it prints
+def run_fresh(snippet):
+    output = subprocess.run([sys.executable, "-c", snippet], cwd=HERE,
+                            check=True, capture_output=True, text=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+# Peak resident set size of this process in KB
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+# Median time to first frame, with reportlab loaded lazily and eagerly
+def bench_startup(script=APP_SCRIPT, repeat=7):
+    results = {}
+    for label, preload in (("lazy", ""), ("eager", EAGER_REPORTLAB)):
+        snippet = STARTUP_SNIPPET.format(preload=preload, script=script)
+        times = [run_fresh(snippet) for _ in range(repeat)]
+        results[f"{label}_s"] = statistics.median(times)
+    results["saved_s"] = results["eager_s"] - results["lazy_s"]
+    return results
+
+
+# Per-question latency of showing answer options, comparing destroying and
+# recreating the buttons with reconfiguring a fixed pool
+def bench_answer_buttons(questions=500, option_count=3):
+    import tkinter as tk
+    from quiz_engine import QuizEngine
+
+    root = tk.Tk()
+    frame = tk.Frame(root)
+    frame.pack()
+    engine = QuizEngine(option_count=option_count)
+    regions = list(engine.regions)
+
+    def recreate(buttons, options):
+        for button in buttons:
+            button.destroy()
+        buttons[:] = []
+        for option in options:
+            button = tk.Button(frame, text=option, font=("Arial", 12),
+                               command=lambda ans=option: None)
+            button.pack(pady=5)
+            buttons.append(button)
+
+    pool = [tk.Button(frame, font=("Arial", 12)) for _ in range(option_count)]
+
+    def reconfigure(buttons, options):
+        for index, button in enumerate(pool):
+            if index < len(options):
+                button.config(text=options[index])
+                button.pack(pady=5)
+            else:
+                button.pack_forget()
+
+    results = {}
+    for label, show in (("recreate", recreate), ("pool", reconfigure)):
+        buttons = []
+        start = time.perf_counter()
+        for number in range(questions):
+            show(buttons, engine.show_question(regions[number % len(regions)]))
+            root.update_idletasks()
+        results[f"{label}_s"] = (time.perf_counter() - start) / questions
+        for button in buttons:
+            button.destroy()
+        for button in pool:
+            button.pack_forget()
+    root.destroy()
+    return results
+
+
+# Time per question (open, then answer) for a map of many markers when
+# every marker's state and colour is set on each event, either sent
+# straight to Tk or through quiz_view, which sends only what changed
+def bench_view(markers=500, questions=300):
+    import tkinter as tk
+    from quiz_view import WidgetView
+
+    root = tk.Tk()
+    canvas = tk.Canvas(root, width=800, height=600)
+    canvas.pack()
+    label = tk.Label(root)
+    label.pack()
+    tags = []
+    for number in range(markers):
+        tag = f"region{number}"
+        x, y = 40 + number % 20 * 36, 20 + number // 20 * 22
+        canvas.create_rectangle(x - 16, y - 8, x + 16, y + 8, fill="white",
+                                tags=("region", "marker", tag))
+        canvas.create_text(x, y, text=str(number), fill="black",
+                           tags=("region", "label", tag))
+        tags.append(tag)
+
+    view = WidgetView(root)
+
+    def view_item(tag, **options):
+        view.itemconfigure(canvas, tag, **options)
+
+    def view_label(text):
+        view.configure(label, text=text)
+
+    def direct_label(text):
+        label.configure(text=text)
+
+    results = {}
+    for name, set_item, set_label in (
+            ("direct", canvas.itemconfigure, direct_label),
+            ("view", view_item, view_label)):
+        answered = set()
+        start = time.perf_counter()
+        for number in range(questions):
+            asked = number % markers
+            set_label(f"Question {asked}")
+            for tag in tags:
+                set_item(tag, state=tk.DISABLED)
+            root.update_idletasks()
+
+            answered.add(asked)
+            set_label("")
+            for index, tag in enumerate(tags):
+                set_item(f"{tag}&&marker",
+                         fill="green" if index in answered else "white")
+                set_item(tag, state=tk.DISABLED if index in answered
+                         else tk.NORMAL)
+            root.update_idletasks()
+        results[f"{name}_question_s"] = (
+            (time.perf_counter() - start) / questions)
+        if name == "view":
+            results["view_calls"] = view.calls / questions
+        canvas.itemconfigure("region", state=tk.NORMAL)
+        canvas.itemconfigure("marker", fill="white")
+    root.destroy()
+    return results
+
+
+# Measure one stage script inside this process: import time, time to first
+# frame, question latency, PDF export time, reset cost and peak RSS. Run by
+# bench_stages in a fresh interpreter per stage; prints a JSON object.
+def measure_stage(filename, cycles=200):
+    from tkinter import messagebox
+
+    # Dialogs would wait for a click, so answer them straight away
+    for name in ("showinfo", "showerror", "showwarning"):
+        setattr(messagebox, name, lambda *args, **kwargs: "ok")
+
+    results = {}
+    try:
+        start = time.perf_counter()
+        module = load_stage(filename)
+        results["import_s"] = time.perf_counter() - start
+        isolate_stage(module)
+
+        import tkinter as tk
+        start = time.perf_counter()
+        root = tk.Tk()
+        app = module.AotearoaQuiz(root)
+        root.update()
+        results["first_frame_s"] = time.perf_counter() - start
+
+        state = getattr(app, "engine", app)
+        if hasattr(app, "show_question") and hasattr(app, "check_answer"):
+            takes_answer = bool(inspect.signature(
+                app.check_answer).parameters)
+            latencies = []
+            for _ in range(cycles):
+                answered = getattr(state, "answered_regions", ())
+                pending = [region for region in state.regions
+                           if region not in answered]
+                if not pending:
+                    if not hasattr(app, "reset_quiz"):
+                        break
+                    app.reset_quiz()
+                    continue
+                region = pending[0]
+                start = time.perf_counter()
+                app.show_question(region)
+                answer = (getattr(state, "correct_answer", None) or
+                          state.regions[region][0])
+                if takes_answer:
+                    app.check_answer(answer)
+                else:
+                    app.answer_entry.insert(0, answer)
+                    app.check_answer()
+                root.update_idletasks()
+                latencies.append(time.perf_counter() - start)
+            if latencies:
+                results["question_s"] = statistics.median(latencies)
+
+        if hasattr(app, "export_results_pdf"):
+            working_dir = os.getcwd()
+            with tempfile.TemporaryDirectory() as export_dir:
+                os.chdir(export_dir)
+                try:
+                    start = time.perf_counter()
+                    app.export_results_pdf()
+                    if getattr(app, "export_thread", None) is not None:
+                        app.export_thread.join()
+                    results["export_s"] = time.perf_counter() - start
+                finally:
+                    os.chdir(working_dir)
+
+        if hasattr(app, "reset_quiz"):
+            start = time.perf_counter()
+            app.reset_quiz()
+            root.update_idletasks()
+            results["reset_s"] = time.perf_counter() - start
+
+        root.destroy()
+    except Exception as e:
+        results["error"] = f"{type(e).__name__}: {e}"
+
+    results["peak_rss_kb"] = peak_rss_kb()
+    print(json.dumps(results))
+
+
+# Measure every stage script, each in a fresh interpreter
+def bench_stages(cycles=200):
+    results = {}
+    for filename in stage_scripts():
+        snippet = (f"import quiz_bench; "
+                   f"quiz_bench.measure_stage({filename!r}, {cycles})")
+        output = subprocess.run([sys.executable, "-c", snippet], cwd=HERE,
+                                capture_output=True, text=True)
+        lines = output.stdout.strip().splitlines()
+        try:
+            results[filename] = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            results[filename] = {"error": output.stderr.strip()[-200:]}
+    return results
+
+
+# Headless measurements of the quiz engine and PDF writer, no display needed
+def bench_engine(sessions=2000):
+    import random
+
+    results = {"import_s": run_fresh(
+        "import time; start = time.perf_counter(); import quiz_engine; "
+        "print(time.perf_counter() - start)")}
+
+    from quiz_engine import QuizEngine, play_session
+    engine = QuizEngine()
+    start = time.perf_counter()
+    for _ in range(sessions):
+        engine.reset()
+        play_session(engine, lambda region, options: random.choice(options))
+    elapsed = time.perf_counter() - start
+    results["question_s"] = elapsed / (sessions * engine.total_questions)
+    results["sessions_per_sec"] = sessions / elapsed
+
+    start = time.perf_counter()
+    engine.reset()
+    results["reset_s"] = time.perf_counter() - start
+
+    play_session(engine, lambda region, options: random.choice(options))
+    try:
+        import quiz_pdf
+        with tempfile.TemporaryDirectory() as export_dir:
+            start = time.perf_counter()
+            quiz_pdf.write_results_pdf(
+                os.path.join(export_dir, "quiz_results.pdf"),
+                engine.correct_answers, engine.incorrect_answers,
+                engine.accuracy(), engine.quiz_history)
+            results["export_s"] = time.perf_counter() - start
+    except ImportError as e:
+        results["error"] = f"ImportError: {e}"
+
+    results["peak_rss_kb"] = peak_rss_kb()
+    return results
+
+
+# Play many concurrent sessions against quiz_server on localhost, reporting
+# requests per second and the server-side time spent handling each answer
+def bench_server(sessions=2000, connections=200):
+    import asyncio
+    import random
+    from quiz_server import QuizServer
+
+    server = QuizServer()
+    answer_times = []
+    handle_request = server.handle_request
+
+    def timed_handle_request(method, path, body):
+        start = time.perf_counter()
+        result = handle_request(method, path, body)
+        if path.endswith("/answer"):
+            answer_times.append(time.perf_counter() - start)
+        return result
+
+    server.handle_request = timed_handle_request
+
+    async def request(reader, writer, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        return json.loads(await reader.readexactly(length))
+
+    async def client(port, count):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(count):
+            session = await request(reader, writer, "POST", "/sessions")
+            path = f"/sessions/{session['session']}"
+            for region in session["regions"]:
+                question = await request(reader, writer, "POST",
+                                         path + "/question",
+                                         {"region": region})
+                await request(reader, writer, "POST", path + "/answer",
+                              {"answer": random.choice(question["options"])})
+        writer.close()
+
+    async def run():
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        start = time.perf_counter()
+        await asyncio.gather(*(client(port, sessions // connections)
+                               for _ in range(connections)))
+        elapsed = time.perf_counter() - start
+        server.expiry_task.cancel()
+        listener.close()
+        await listener.wait_closed()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    requests = (sessions // connections) * connections * (
+        1 + 2 * len(server.regions))
+    return {"sessions": len(server.sessions),
+            "requests_per_sec": requests / elapsed,
+            "answer_handling_s": statistics.mean(answer_times),
+            "peak_rss_kb": peak_rss_kb()}
+
+
+# Answers per second written through quiz_store, both queued by the caller
+# and committed to SQLite by the writer thread
+def bench_store(sessions=5000):
+    import random
+    from quiz_engine import QuizEngine, play_session
+    from quiz_store import ResultsStore
+
+    engine = QuizEngine()
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ResultsStore(os.path.join(store_dir, "bench.db"))
+        answers = 0
+        start = time.perf_counter()
+        for number in range(sessions):
+            engine.reset()
+            session_id = store.start_session(engine.total_questions,
+                                             f"student{number % 30}")
+            play_session(engine,
+                         lambda region, options: random.choice(options))
+            for entry in engine.quiz_history:
+                store.record_answer(session_id, entry)
+            store.finish_session(session_id, engine.correct_answers,
+                                 engine.incorrect_answers)
+            answers += len(engine.quiz_history)
+        queued = time.perf_counter() - start
+        store.flush()
+        committed = time.perf_counter() - start
+        store.close()
+    return {"answers": answers,
+            "queued_per_sec": answers / queued,
+            "committed_per_sec": answers / committed}
+
+
+# Time to write a results PDF with a short and a very long history
+def bench_pdf(sizes=(14, 20000)):
+    import random
+    from quiz_engine import REGIONS
+    try:
+        import quiz_pdf
+        quiz_pdf.load_reportlab()
+    except ImportError as e:
+        return {"error": f"ImportError: {e}"}
+
+    names = list(REGIONS)
+    results = {}
+    with tempfile.TemporaryDirectory() as export_dir:
+        for size in sizes:
+            history = []
+            for number in range(size):
+                region = random.choice(names)
+                history.append({"region": region,
+                                "correct_answer": REGIONS[region][0],
+                                "user_answer": random.choice(
+                                    REGIONS[random.choice(names)]),
+                                "correct": number % 3 == 0})
+            start = time.perf_counter()
+            quiz_pdf.write_results_pdf(
+                os.path.join(export_dir, f"results{size}.pdf"),
+                size // 3, size - size // 3, 33.3, history)
+            elapsed = time.perf_counter() - start
+            results[f"{size} rows"] = {"export_s": elapsed,
+                                       "rows_per_sec": size / elapsed}
+    results["peak_rss_kb"] = peak_rss_kb()
+    return results
+
+
+# PDF reports per second written by quiz_reports for a term of stored
+# sessions, with one worker process and with one per core
+def bench_reports(sessions=300):
+    import random
+    from quiz_engine import QuizEngine, play_session
+    from quiz_store import ResultsStore
+    import quiz_reports
+
+    engine = QuizEngine()
+    results = {}
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ResultsStore(os.path.join(store_dir, "bench.db"))
+        for number in range(sessions):
+            engine.reset()
+            session_id = store.start_session(engine.total_questions,
+                                             f"Student {number % 30}")
+            play_session(engine,
+                         lambda region, options: random.choice(options))
+            for entry in engine.quiz_history:
+                store.record_answer(session_id, entry)
+        store.flush()
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            try:
+                written = quiz_reports.export_reports(
+                    store, os.path.join(store_dir, f"reports{workers}"),
+                    workers=workers)
+            except ImportError as e:
+                results["error"] = f"ImportError: {e}"
+                break
+            results[f"{workers}_workers_per_sec"] = (
+                len(written) / (time.perf_counter() - start))
+        store.close()
+    return results
+
+
+# Record sessions to a quiz_events log, then replay the log: events per
+# second both ways, bytes per event and any replay mismatches
+def bench_replay(sessions=2000):
+    import random
+    from quiz_engine import QuizEngine, play_session
+    import quiz_events
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        path = os.path.join(log_dir, "bench.qlog")
+        events = quiz_events.EventLog(path, list(QuizEngine().regions))
+        engine = QuizEngine(events=events)
+        start = time.perf_counter()
+        for _ in range(sessions):
+            engine.reset()
+            play_session(engine,
+                         lambda region, options: random.choice(options))
+        recorded = time.perf_counter() - start
+        events.close()
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        _, _, logged = quiz_events.read_events(path)
+        read = time.perf_counter() - start
+        start = time.perf_counter()
+        count, mismatches = quiz_events.replay(logged)
+        replayed = time.perf_counter() - start
+    return {"events": count,
+            "bytes_per_event": size / count,
+            "recorded_per_sec": count / recorded,
+            "read_per_sec": count / read,
+            "replayed_per_sec": count / replayed,
+            "mismatches": len(mismatches)}
+
+
+# Simulated sessions per second for each quiz_simulate learner model
+def bench_simulate(sessions=1000000):
+    try:
+        import quiz_simulate
+    except ImportError as e:
+        return {"error": f"ImportError: {e}"}
+
+    deck = quiz_simulate.DeckArrays()
+    results = {}
+    for model in quiz_simulate.LEARNER_MODELS:
+        start = time.perf_counter()
+        simulation = quiz_simulate.simulate(sessions, model, deck=deck,
+                                            seed=0)
+        elapsed = time.perf_counter() - start
+        results[model] = {"sessions_per_sec": sessions / elapsed,
+                          "mean_score": simulation.mean_score()}
+    results["peak_rss_kb"] = peak_rss_kb()
+    return results
+
+
+# Build time of a quiz_fuzzy index over a large vocabulary of made-up
+# Maori-style names, and lookup time for typed answers with typos against
+# a linear scan of every name
+def bench_fuzzy(names=30000, lookups=300):
+    import random
+    import quiz_fuzzy
+
+    rng = random.Random(0)
+    syllables = [consonant + vowel for consonant in
+                 ["", "h", "k", "m", "n", "ng", "p", "r", "t", "w", "wh"]
+                 for vowel in "aeiouāēīōū"]
+    vocabulary = set()
+    while len(vocabulary) < names:
+        vocabulary.add(" ".join(
+            "".join(rng.choice(syllables)
+                    for _ in range(rng.randint(2, 4))).capitalize()
+            for _ in range(rng.randint(1, 3))))
+    vocabulary = sorted(vocabulary)
+
+    start = time.perf_counter()
+    index = quiz_fuzzy.AnswerIndex(vocabulary)
+    build_s = time.perf_counter() - start
+
+    queries = []
+    for name in rng.sample(vocabulary, lookups):
+        typed = list(quiz_fuzzy.normalise(name))
+        position = rng.randrange(len(typed))
+        typed[position] = rng.choice("aeiouhkt")
+        queries.append("".join(typed))
+
+    start = time.perf_counter()
+    found = sum(bool(index.match(query)) for query in queries)
+    lookup_s = (time.perf_counter() - start) / lookups
+
+    keys = list(index.names)
+    start = time.perf_counter()
+    for query in queries[:20]:
+        limit = quiz_fuzzy.typo_limit(len(query))
+        [key for key in keys
+         if quiz_fuzzy.edit_distance(query, key, limit) <= limit]
+    scan_s = (time.perf_counter() - start) / 20
+    return {"names": len(vocabulary),
+            "build_s": build_s,
+            "lookup_s": lookup_s,
+            "linear_scan_s": scan_s,
+            "found": found / lookups}
+
+
+# Time per question (generate and check) in each question direction for a
+# made-up deck of many regions, some sharing Maori names and some whose
+# Maori name is the same as their English name
+def bench_directions(regions=12000, questions=50000):
+    import random
+    from quiz_engine import DIRECTIONS, DistractorIndex, QuizEngine
+
+    rng = random.Random(0)
+    deck = {}
+    for number in range(regions):
+        name = f"Region {number}"
+        if number % 50 == 0:
+            deck[name] = [name]
+        else:
+            deck[name] = [f"Ingoa {rng.randrange(regions * 2)}"
+                          for _ in range(rng.randint(1, 3))]
+
+    results = {}
+    start = time.perf_counter()
+    distractors = DistractorIndex(deck)
+    reverse_distractors = DistractorIndex(deck, reverse=True)
+    results["index_build_s"] = time.perf_counter() - start
+
+    names = list(deck)
+    asked = [rng.choice(names) for _ in range(questions)]
+    for direction in DIRECTIONS:
+        engine = QuizEngine(deck, distractors, direction=direction,
+                            reverse_distractors=reverse_distractors, seed=0)
+        start = time.perf_counter()
+        for region in asked:
+            options = engine.show_question(region)
+            engine.check_answer(options[0])
+        results[f"{direction}_question_s"] = (
+            (time.perf_counter() - start) / questions)
+    return results
+
+
+# Time to pick and reschedule one card in quiz_scheduler for growing decks,
+# against a linear scan for the card due soonest. The heap's time per pick
+# should barely grow with the deck while the scan grows with it.
+def bench_scheduler(sizes=(1000, 10000, 100000), picks=20000):
+    import random
+    from quiz_scheduler import SpacedRepetitionScheduler
+
+    results = {}
+    for size in sizes:
+        clock = [0.0]
+        scheduler = SpacedRepetitionScheduler(
+            [f"place{number}" for number in range(size)],
+            clock=lambda: clock[0])
+        rng = random.Random(size)
+        start = time.perf_counter()
+        for _ in range(picks):
+            clock[0] += 1
+            scheduler.record(scheduler.next_region(), rng.random() < 0.7)
+        heap_s = (time.perf_counter() - start) / picks
+
+        scans = max(1, picks * 1000 // size)
+        cards = scheduler.cards
+        start = time.perf_counter()
+        for _ in range(scans):
+            min(cards, key=lambda region: cards[region].due)
+        scan_s = (time.perf_counter() - start) / scans
+        results[f"{size} places"] = {"pick_s": heap_s,
+                                     "linear_scan_s": scan_s}
+    return results
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "buttons": bench_answer_buttons,
+    "view": bench_view,
+    "stages": bench_stages,
+    "engine": bench_engine,
+    "server": bench_server,
+    "store": bench_store,
+    "scheduler": bench_scheduler,
+    "reports": bench_reports,
+    "pdf": bench_pdf,
+    "replay": bench_replay,
+    "simulate": bench_simulate,
+    "fuzzy": bench_fuzzy,
+    "directions": bench_directions,
+}
+
+
+# Format a metric for the console: seconds as ms, RSS in KB
+def format_metric(key, value):
+    if key.endswith("_s"):
+        return f"{value * 1000:10.3f} ms"
+    if key.endswith("_kb"):
+        return f"{value:10d} KB"
+    if isinstance(value, float):
+        return f"{value:13.1f}"
+    return str(value)
+
+
+# Print results, one line per metric, nesting per-stage results
+def print_results(name, results, indent=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            print(f"{indent}{name} {key}")
+            print_results("", value, indent + "    ")
+        else:
+            print(f"{indent}{name:<10} {key:<15} {format_metric(key, value)}")
+
+
+# Run the benchmarks named on the command line, print and save the results
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("benchmarks", nargs="*",
+                        help="any of: " + ", ".join(sorted(BENCHMARKS)))
+    parser.add_argument("--output", help="JSON file to write results to "
+                                         "(default: bench_results/)")
+    args = parser.parse_args(argv)
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    report = {"started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "results": {}}
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        results = BENCHMARKS[name]()
+        report["results"][name] = results
+        print_results(name, results)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as results_file:
+        json.dump(report, results_file, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""quiz_data loads the region table (English names, accepted Maori names,
+marker positions and colours) from regions.json or a CSV file. The first
+load compiles it into a compact binary cache that later launches map
+straight back in, with every name decoded in one pass and interned.
+
+CSV files have the columns name, maori_names, x, y, color, with several
+accepted Maori names separated by "|"."""
+
+# Import helpers for packing the binary cache; csv and json are only
+# imported when a data file has to be parsed
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "regions.json")
+
+CACHE_DIR = ".asset_cache"
+
+# Binary cache layout (all little-endian):
+#   header      magic, version, region count, string count
+#   offsets     string count + 1 uint32 character offsets into the text
+#   text        uint32 byte length, then every distinct string as UTF-8
+#   regions     per region: name, colour, x, y, first Maori name, count
+#   maori       string index of each accepted Maori name
+CACHE_MAGIC = b"AQRD"
+CACHE_VERSION = 1
+HEADER = struct.Struct("<4sHxxII")
+REGION_FIELDS = 6
+
+
+# Regions with their accepted Maori names, marker positions and colours
+class RegionDataset(object):
+    def __init__(self, regions, markers, colors):
+        self.regions = regions
+        self.markers = markers
+        self.colors = colors
+        self.names = tuple(regions)
+
+
+# Read the regions from a JSON or CSV data file
+def parse_dataset(path):
+    regions, markers, colors = {}, {}, {}
+    if path.lower().endswith(".csv"):
+        import csv
+        with open(path, newline="", encoding="utf-8") as data_file:
+            rows = [{"name": row["name"],
+                     "maori_names": row["maori_names"].split("|"),
+                     "marker": (row["x"], row["y"]),
+                     "color": row["color"]}
+                    for row in csv.DictReader(data_file)]
+    else:
+        import json
+        with open(path, encoding="utf-8") as data_file:
+            rows = json.load(data_file)["regions"]
+
+    for row in rows:
+        name = row["name"]
+        regions[name] = [maori.strip() for maori in row["maori_names"]]
+        markers[name] = (int(row["marker"][0]), int(row["marker"][1]))
+        colors[name] = row["color"]
+    return RegionDataset(regions, markers, colors)
+
+
+# Pack a dataset into the binary cache format
+def compile_dataset(dataset):
+    strings = {}
+
+    def string_id(text):
+        return strings.setdefault(text, len(strings))
+
+    records = array("i")
+    maori_ids = array("i")
+    for name in dataset.names:
+        records.extend((string_id(name), string_id(dataset.colors[name]),
+                        dataset.markers[name][0], dataset.markers[name][1],
+                        len(maori_ids), len(dataset.regions[name])))
+        maori_ids.extend(string_id(maori) for maori in dataset.regions[name])
+
+    offsets = array("I", [0])
+    for text in strings:
+        offsets.append(offsets[-1] + len(text))
+    text = "".join(strings).encode("utf-8")
+    padding = b"\0" * (-len(text) % 4)
+    if sys.byteorder == "big":
+        for values in (offsets, records, maori_ids):
+            values.byteswap()
+
+    return b"".join((
+        HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(dataset.names),
+                    len(strings)),
+        offsets.tobytes(), struct.pack("<I", len(text)), text, padding,
+        records.tobytes(), maori_ids.tobytes()))
+
+
+# Copy a little-endian integer array out of the cache
+def read_array(typecode, data, start, end):
+    values = array(typecode)
+    values.frombytes(data[start:end])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+# Rebuild a dataset from a memory-mapped binary cache
+def read_compiled(data):
+    magic, version, region_count, string_count = HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        raise ValueError("not a region cache")
+    position = HEADER.size
+    offsets_end = position + 4 * (string_count + 1)
+    offsets = read_array("I", data, position, offsets_end)
+    position = offsets_end
+    (text_length,) = struct.unpack_from("<I", data, position)
+    position += 4
+    text = data[position:position + text_length].decode("utf-8")
+    position += text_length + (-text_length % 4)
+    records_end = position + 4 * REGION_FIELDS * region_count
+    records = read_array("i", data, position, records_end)
+    maori_ids = read_array("i", data, records_end, len(data))
+
+    strings = [sys.intern(text[start:end])
+               for start, end in zip(offsets, offsets[1:])]
+    string_at = strings.__getitem__
+    names = list(map(string_at, records[0::REGION_FIELDS]))
+    maori_names = list(map(string_at, maori_ids))
+    regions = dict(zip(names, [
+        maori_names[first:first + count] for first, count in
+        zip(records[4::REGION_FIELDS], records[5::REGION_FIELDS])]))
+    markers = dict(zip(names, zip(records[2::REGION_FIELDS],
+                                  records[3::REGION_FIELDS])))
+    colors = dict(zip(names, map(string_at, records[1::REGION_FIELDS])))
+    return RegionDataset(regions, markers, colors)
+
+
+# Load a dataset, from its binary cache when the data file is unchanged,
+# compiling the cache on first load. The cache sits in CACHE_DIR next to
+# the data file and is named after the size and CRC-32 of its content.
+def load_dataset(path=DEFAULT_DATASET):
+    with open(path, "rb") as data_file:
+        content = data_file.read()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(
+        os.path.dirname(os.path.abspath(path)), CACHE_DIR,
+        f"{stem}.{len(content):x}-{zlib.crc32(content):08x}.bin")
+
+    try:
+        with open(cache_path, "rb") as cache_file:
+            with mmap.mmap(cache_file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as data:
+                return read_compiled(data)
+    except (OSError, ValueError, struct.error):
+        pass
+
+    dataset = parse_dataset(path)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        partial_path = cache_path + ".part"
+        with open(partial_path, "wb") as cache_file:
+            cache_file.write(compile_dataset(dataset))
+        os.replace(partial_path, cache_path)
+    except OSError:
+        pass
+    return dataset
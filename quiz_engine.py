@@ -0,0 +1,343 @@
+"""quiz_engine holds the Aotearoa quiz logic without any Tk widgets, so a
+quiz can be played, simulated or benchmarked without a display."""
+
+# Import random for question generation and quiz_data for the region table
+import random
+
+from quiz_data import load_dataset
+
+# Dictionary mapping regions to their Maori names, loaded from regions.json
+REGIONS = load_dataset().regions
+
+
+# Derive count independent 64-bit seeds from one root seed, e.g. one per
+# batch of quiz_simulate sessions, so batches can run in any order or
+# worker process. Each seed is a BLAKE2b hash of the root and its index,
+# so the streams do not overlap and come out the same on every machine
+# (with or without NumPy).
+def spawn_seeds(root_seed, count):
+    from hashlib import blake2b
+    return [int.from_bytes(blake2b(f"{root_seed}:{index}".encode("ascii"),
+                                   digest_size=8).digest(), "little")
+            for index in range(count)]
+
+
+# Question directions: English region -> Maori name, Maori name -> English
+# region, or either at random for each question
+DIRECTIONS = ("forward", "reverse", "mixed")
+
+
+# Pool of wrong answers built once at load time and shared by every
+# question. The pool leaves out any Maori name that is the same as an
+# English region name (e.g. "Waikato", "Taranaki") since those give the
+# answer away, and each region's own accepted names are skipped when
+# sampling, so a question never offers a synonym of its answer.
+#
+# With reverse=True the index is for Maori name -> region questions: the
+# pool holds the English region names and excluded is the inverted index
+# from each Maori name to every region that accepts it, so a name shared by
+# several regions (or the same as a region's English name) never has a
+# right answer offered as a distractor.
+class DistractorIndex(object):
+    def __init__(self, regions, reverse=False):
+        if reverse:
+            regions_by_name = {}
+            for region, names in regions.items():
+                for name in names:
+                    regions_by_name.setdefault(name, set()).add(region)
+            self.pool = tuple(sorted(regions))
+            self.excluded = {name: frozenset(owners)
+                             for name, owners in regions_by_name.items()}
+            return
+
+        english_names = set(regions)
+        self.pool = tuple(sorted({name for names in regions.values()
+                                  for name in names
+                                  if name not in english_names}))
+        self.excluded = {region: frozenset(names)
+                         for region, names in regions.items()}
+
+    # Pick up to k distinct wrong answers for a region (or, reversed, for a
+    # Maori name) in O(k)
+    def sample(self, key, k, rng=random):
+        if k <= 0:
+            return []
+        excluded = self.excluded[key]
+        count = min(k + len(excluded), len(self.pool))
+        options = []
+        for name in rng.sample(self.pool, count):
+            if name not in excluded:
+                options.append(name)
+                if len(options) == k:
+                    break
+        return options
+
+
+# Quiz state, question generation, scoring and history for one session.
+# With a quiz_scheduler.SpacedRepetitionScheduler every answer is also fed
+# to the scheduler, and next_region() says which region to ask next. With a
+# quiz_events.EventLog every question, answer, close and reset is logged.
+#
+# Every session (each reset) owns a random.Random seeded with its own
+# session seed, so nothing is shared with the global random module or other
+# sessions. Session seeds come from a stream seeded with seed, so an engine
+# built with the same seed plays the same sessions. Each question is then
+# generated from a question seed drawn from the session's generator, and
+# that seed is kept in the history so any question can be reproduced alone.
+#
+# direction is one of DIRECTIONS. Questions are still about a region (its
+# marker, its place in the scheduler), but a reverse question names one of
+# the region's Maori names and offers English region names as options.
+class QuizEngine(object):
+    def __init__(self, regions=None, distractors=None, option_count=3,
+                 scheduler=None, events=None, seed=None, answer_index=None,
+                 direction="forward", reverse_distractors=None,
+                 region_index=None):
+        self.regions = regions if regions is not None else REGIONS
+        if option_count < 1:
+            raise ValueError("option_count must be at least 1")
+        self.option_count = option_count
+        if distractors is None:
+            distractors = DistractorIndex(self.regions)
+        self.distractors = distractors
+        if direction not in DIRECTIONS:
+            raise ValueError(f"unknown question direction: {direction}")
+        self.direction = direction
+        if reverse_distractors is None and direction != "forward":
+            reverse_distractors = DistractorIndex(self.regions, reverse=True)
+        self.reverse_distractors = reverse_distractors
+        self.region_index = region_index
+        self.scheduler = scheduler
+        self.total_questions = len(self.regions)
+        # Answered and correct regions are kept as bits of two integers,
+        # bit i standing for the region with ID i (its place in regions)
+        self.region_names = tuple(self.regions)
+        self.region_ids = {region: region_id for region_id, region
+                           in enumerate(self.region_names)}
+        self.all_regions_mask = (1 << len(self.region_names)) - 1
+        self.answer_index = answer_index
+        self.session_seeds = random.Random(seed)
+        self.question_seed = None
+        self.events = events
+        if events is not None:
+            events.start(option_count, direction)
+        self.reset()
+
+    # Clear scores, answered regions and history for a fresh quiz, seeding
+    # the session's generator with seed (or the next session seed)
+    def reset(self, seed=None):
+        if seed is None:
+            seed = self.session_seeds.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.correct_answers = 0
+        self.incorrect_answers = 0
+        self.answered_mask = 0
+        self.correct_mask = 0
+        self.quiz_history = []
+        self.prepared = {}
+        self._clear_question()
+        if self.events is not None:
+            self.events.reset(seed)
+
+    # Forget the question currently being asked, if any
+    def close_question(self):
+        if self.events is not None and self.current_region:
+            self.events.close_question()
+        self._clear_question()
+
+    def _clear_question(self):
+        self.current_region = None
+        self.current_direction = None
+        self.current_prompt = None
+        self.correct_answer = None
+        self.current_options = []
+        self.current_accepted = frozenset()
+
+    # Pick the direction, prompt, answer and shuffled options for a region
+    # from a seed, along with every answer that counts as correct
+    def _generate_question(self, region, seed):
+        rng = random.Random(seed)
+        direction = self.direction
+        if direction == "mixed":
+            direction = "reverse" if rng.random() < 0.5 else "forward"
+        if direction == "forward":
+            prompt = region
+            correct_answer = rng.choice(self.regions[region])
+            accepted = self.distractors.excluded[region]
+            options = self.distractors.sample(region, self.option_count - 1,
+                                              rng)
+        else:
+            prompt = rng.choice(self.regions[region])
+            correct_answer = region
+            accepted = self.reverse_distractors.excluded[prompt]
+            options = self.reverse_distractors.sample(
+                prompt, self.option_count - 1, rng)
+        options.append(correct_answer)
+        rng.shuffle(options)
+        return seed, direction, prompt, correct_answer, options, accepted
+
+    # Generate questions for regions ahead of time, e.g. while feedback for
+    # the last answer is on screen
+    def prefetch(self, regions):
+        for region in regions:
+            if region not in self.prepared:
+                self.prepared[region] = self._generate_question(
+                    region, self.rng.getrandbits(64))
+
+    # Ask the question for a region (prefetched if available, or generated
+    # from the given seed when replaying), return the options
+    def show_question(self, region, seed=None):
+        self.current_region = region
+        question = self.prepared.pop(region, None)
+        if question is None or seed is not None and seed != question[0]:
+            if seed is None:
+                seed = self.rng.getrandbits(64)
+            question = self._generate_question(region, seed)
+        (self.question_seed, self.current_direction, self.current_prompt,
+         self.correct_answer, self.current_options,
+         self.current_accepted) = question
+        if self.events is not None:
+            self.events.question(region, self.question_seed,
+                                 self.current_options)
+        return self.current_options
+
+    # Text shown above the answer options for the current question
+    def question_text(self):
+        if self.current_direction == "reverse":
+            return f"Which region has the Maori name {self.current_prompt}?"
+        return f"What is the Maori name for {self.current_region}?"
+
+    # Score the user's answer, record it in history and close the question.
+    # Any accepted answer counts, e.g. either region for a Maori name that
+    # two regions share.
+    def check_answer(self, user_answer):
+        if not self.current_region:
+            return None
+        correct = user_answer in self.current_accepted
+        return self._record_answer(
+            user_answer, correct,
+            user_answer if correct else self.correct_answer)
+
+    # Score a typed answer, which is correct when it matches one of the
+    # accepted answers allowing for macrons, case, hyphens and a few typos
+    # ("otakou" for "Ōtākou")
+    def check_typed_answer(self, text):
+        if not self.current_region:
+            return None
+        index = (self.get_region_index()
+                 if self.current_direction == "reverse"
+                 else self.get_answer_index())
+        matches = [name for name in index.match(text)
+                   if name in self.current_accepted]
+        if matches:
+            return self._record_answer(text, True, matches[0], typed=True)
+        return self._record_answer(text, False, self.correct_answer,
+                                   typed=True)
+
+    # Index of every accepted name for typed answers, built on first use
+    def get_answer_index(self):
+        if self.answer_index is None:
+            from quiz_fuzzy import AnswerIndex
+            self.answer_index = AnswerIndex(
+                name for names in self.regions.values() for name in names)
+        return self.answer_index
+
+    # Index of the English region names for typed reverse answers
+    def get_region_index(self):
+        if self.region_index is None:
+            from quiz_fuzzy import AnswerIndex
+            self.region_index = AnswerIndex(self.regions)
+        return self.region_index
+
+    # Record an answer in history and scores and close the question, then
+    # tell the event log and the scheduler (so a failure there cannot leave
+    # the answer half recorded)
+    def _record_answer(self, user_answer, correct, correct_answer,
+                       typed=False):
+        region = self.current_region
+        self.quiz_history.append({
+            "region": self.current_region,
+            "direction": self.current_direction,
+            "prompt": self.current_prompt,
+            "correct_answer": correct_answer,
+            "user_answer": user_answer,
+            "correct": correct,
+            "seed": self.question_seed
+        })
+        if correct:
+            self.correct_answers += 1
+        else:
+            self.incorrect_answers += 1
+        bit = 1 << self.region_ids[region]
+        self.answered_mask |= bit
+        if correct:
+            self.correct_mask |= bit
+        else:
+            self.correct_mask &= ~bit
+        self._clear_question()
+
+        if self.events is not None:
+            self.events.answer(user_answer, correct, typed)
+        if self.scheduler is not None:
+            self.scheduler.record(region, correct)
+        return correct
+
+    # Region the scheduler wants asked next (adaptive order)
+    def next_region(self):
+        return self.scheduler.next_region()
+
+    # True if a region has been answered in this quiz
+    def is_answered(self, region):
+        return bool(self.answered_mask >> self.region_ids[region] & 1)
+
+    # Regions answered so far (built from the answered bits)
+    @property
+    def answered_regions(self):
+        return frozenset(region_names_in(self.answered_mask,
+                                         self.region_names))
+
+    # Regions that can still be picked on the map
+    def available_regions(self):
+        return list(region_names_in(self.all_regions_mask &
+                                    ~self.answered_mask, self.region_names))
+
+    # Answered and correct bits as a pair of integers; equal snapshots mean
+    # the map looks the same
+    def snapshot(self):
+        return self.answered_mask, self.correct_mask
+
+    # Snapshot as a short string, e.g. for naming cached map renderings
+    def state_key(self):
+        return f"{self.answered_mask:x}-{self.correct_mask:x}"
+
+    # True once every region has been answered
+    def is_finished(self):
+        return self.answered_mask == self.all_regions_mask
+
+    # Percentage of answers that were correct (regions can be asked more
+    # than once in adaptive order)
+    def accuracy(self):
+        answered = self.correct_answers + self.incorrect_answers
+        return (self.correct_answers / max(answered, 1)) * 100
+
+
+# Region IDs of the set bits of a mask, lowest first
+def region_ids_in(mask):
+    while mask:
+        low = mask & -mask
+        mask ^= low
+        yield low.bit_length() - 1
+
+
+# Names of the regions whose bits are set in a mask
+def region_names_in(mask, region_names):
+    return (region_names[region_id] for region_id in region_ids_in(mask))
+
+
+# Play one whole quiz, choosing answers with chooser(region, options)
+def play_session(engine, chooser):
+    for region in engine.available_regions():
+        options = engine.show_question(region)
+        engine.check_answer(chooser(region, options))
+    return engine.correct_answers
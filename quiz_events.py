@@ -0,0 +1,247 @@
+"""quiz_events records every interaction with a quiz (region clicks,
+questions shown with the seed that generated them, answers, closed
+questions and resets) in a compact append-only binary log, and replays
+logs against a QuizEngine at full speed. Replays reproduce the questions
+exactly, so logs of real classroom use double as benchmarks and as a record
+of what led up to a crash.
+
+    python quiz_events.py dump event_logs/20260720-091500-4242.qlog
+    python quiz_events.py replay event_logs/*.qlog --repeat 10
+
+Log layout (all little-endian):
+    header   magic, version, start time, region count, then the region
+             names as NUL-separated UTF-8
+    events   kind, milliseconds since the start time, payload length and
+             the payload, which refers to regions by their header index
+
+Version 1 logs had 16-bit payload lengths and region indexes and 32-bit
+times, so long answers, decks of over 65535 regions or a kiosk running for
+more than 49 days could not be logged; they are still read.
+"""
+
+# Import struct for the record layout, time for timestamps
+import argparse
+import struct
+import sys
+import time
+
+LOG_MAGIC = b"AQEV"
+LOG_VERSION = 2
+HEADER = struct.Struct("<4sHxxdII")
+RECORD = struct.Struct("<BQI")
+
+# Event kinds
+START, RESET, CLICK, QUESTION, ANSWER, CLOSE = range(1, 7)
+KIND_NAMES = {START: "start", RESET: "reset", CLICK: "click",
+              QUESTION: "question", ANSWER: "answer", CLOSE: "close"}
+
+# Payloads: option count and question direction; session seed; region;
+# region, seed and the options; flags and the answer text. Older logs have
+# no direction (forward) and an empty reset payload.
+START_PAYLOAD = struct.Struct("<BB")
+DIRECTION_CODES = ("forward", "reverse", "mixed")
+RESET_PAYLOAD = struct.Struct("<Q")
+REGION_PAYLOAD = struct.Struct("<I")
+QUESTION_PAYLOAD = struct.Struct("<IQ")
+ANSWER_PAYLOAD = struct.Struct("<B")
+ANSWER_CORRECT = 1
+ANSWER_MISSING = 2
+ANSWER_TYPED = 4
+
+# Record, region and question layouts of each readable log version
+LAYOUTS = {
+    1: (struct.Struct("<BIH"), struct.Struct("<H"), struct.Struct("<HQ")),
+    LOG_VERSION: (RECORD, REGION_PAYLOAD, QUESTION_PAYLOAD),
+}
+
+
+# One decoded event; fields that do not apply to its kind are None
+class Event(object):
+    __slots__ = ("kind", "time", "region", "seed", "options", "answer",
+                 "correct", "typed", "option_count", "direction")
+
+    def __init__(self, kind, event_time, region=None, seed=None,
+                 options=None, answer=None, correct=None, typed=None,
+                 option_count=None, direction=None):
+        self.kind = kind
+        self.time = event_time
+        self.region = region
+        self.seed = seed
+        self.options = options
+        self.answer = answer
+        self.correct = correct
+        self.typed = typed
+        self.option_count = option_count
+        self.direction = direction
+
+    def __repr__(self):
+        fields = "".join(f" {name}={getattr(self, name)!r}"
+                         for name in self.__slots__[2:]
+                         if getattr(self, name) is not None)
+        return f"<{KIND_NAMES[self.kind]} at {self.time:.3f}{fields}>"
+
+
+# Writer for one log file; QuizEngine calls the event methods as things
+# happen. Every event is written through to the file straight away so a
+# crash loses nothing that came before it.
+class EventLog(object):
+    def __init__(self, path, region_names):
+        self.path = path
+        self.region_ids = {name: index
+                           for index, name in enumerate(region_names)}
+        self.start_time = time.time()
+        names = "\0".join(region_names).encode("utf-8")
+        self.file = open(path, "wb", buffering=0)
+        self.file.write(HEADER.pack(LOG_MAGIC, LOG_VERSION, self.start_time,
+                                    len(region_names), len(names)) + names)
+
+    # Append one record; the methods below add one of each kind
+    def _write(self, kind, payload=b""):
+        elapsed = int((time.time() - self.start_time) * 1000)
+        self.file.write(RECORD.pack(kind, elapsed, len(payload)) + payload)
+
+    def start(self, option_count, direction="forward"):
+        self._write(START, START_PAYLOAD.pack(
+            option_count, DIRECTION_CODES.index(direction)))
+
+    def reset(self, seed):
+        self._write(RESET, RESET_PAYLOAD.pack(seed))
+
+    def click(self, region):
+        self._write(CLICK, REGION_PAYLOAD.pack(self.region_ids[region]))
+
+    def question(self, region, seed, options):
+        self._write(QUESTION, QUESTION_PAYLOAD.pack(
+            self.region_ids[region], seed) +
+            "\0".join(options).encode("utf-8"))
+
+    def answer(self, user_answer, correct, typed=False):
+        flags = ANSWER_CORRECT if correct else 0
+        if typed:
+            flags |= ANSWER_TYPED
+        if user_answer is None:
+            flags |= ANSWER_MISSING
+            user_answer = ""
+        self._write(ANSWER, ANSWER_PAYLOAD.pack(flags) +
+                    str(user_answer).encode("utf-8"))
+
+    def close_question(self):
+        self._write(CLOSE)
+
+    def close(self):
+        self.file.close()
+
+
+# Read a log, returning (start time, region names, list of events). A
+# record cut short by a crash ends the log.
+def read_events(path):
+    with open(path, "rb") as log_file:
+        data = log_file.read()
+    magic, version, start_time, region_count, names_length = (
+        HEADER.unpack_from(data))
+    if magic != LOG_MAGIC or version not in LAYOUTS:
+        raise ValueError(f"{path} is not a quiz event log")
+    record, region_payload, question_payload = LAYOUTS[version]
+    position = HEADER.size
+    region_names = data[position:position + names_length].decode(
+        "utf-8").split("\0")[:region_count]
+    position += names_length
+
+    events = []
+    while position + record.size <= len(data):
+        kind, elapsed, length = record.unpack_from(data, position)
+        position += record.size
+        payload = data[position:position + length]
+        if len(payload) < length:
+            break
+        position += length
+        event = Event(kind, start_time + elapsed / 1000)
+        if kind == START:
+            event.option_count = payload[0]
+            event.direction = "forward"
+            if length >= START_PAYLOAD.size:
+                event.direction = DIRECTION_CODES[payload[1]]
+        elif kind == RESET and length >= RESET_PAYLOAD.size:
+            (event.seed,) = RESET_PAYLOAD.unpack_from(payload)
+        elif kind == CLICK:
+            event.region = region_names[
+                region_payload.unpack_from(payload)[0]]
+        elif kind == QUESTION:
+            region_id, event.seed = question_payload.unpack_from(payload)
+            event.region = region_names[region_id]
+            event.options = payload[question_payload.size:].decode(
+                "utf-8").split("\0")
+        elif kind == ANSWER:
+            (flags,) = ANSWER_PAYLOAD.unpack_from(payload)
+            event.correct = bool(flags & ANSWER_CORRECT)
+            event.typed = bool(flags & ANSWER_TYPED)
+            if not flags & ANSWER_MISSING:
+                event.answer = payload[ANSWER_PAYLOAD.size:].decode("utf-8")
+        events.append(event)
+    return start_time, region_names, events
+
+
+# Re-run logged events against fresh engines as fast as possible. Returns
+# the number of events replayed and the questions or answers that came out
+# differently from the log (which should be none).
+def replay(events, regions=None):
+    from quiz_engine import QuizEngine
+
+    engine = None
+    mismatches = []
+    for event in events:
+        kind = event.kind
+        if kind == START:
+            engine = QuizEngine(regions, option_count=event.option_count,
+                                direction=event.direction)
+        elif engine is None:
+            continue
+        elif kind == QUESTION:
+            if engine.show_question(event.region,
+                                    event.seed) != event.options:
+                mismatches.append(event)
+        elif kind == ANSWER:
+            check = (engine.check_typed_answer if event.typed
+                     else engine.check_answer)
+            if check(event.answer) != event.correct:
+                mismatches.append(event)
+        elif kind == CLOSE:
+            engine.close_question()
+        elif kind == RESET:
+            engine.reset(event.seed)
+    return len(events), mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or replay quiz "
+                                                 "event logs")
+    parser.add_argument("command", choices=["dump", "replay"])
+    parser.add_argument("logs", nargs="+")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="replay the logs this many times")
+    args = parser.parse_args()
+
+    logs = [read_events(path) for path in args.logs]
+    if args.command == "dump":
+        for path, (start_time, names, events) in zip(args.logs, logs):
+            started = time.strftime("%Y-%m-%d %H:%M:%S",
+                                    time.localtime(start_time))
+            print(f"{path}: {len(events)} events from {started}")
+            for event in events:
+                print(f"  {event!r}")
+    else:
+        count = 0
+        mismatches = []
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, _, events in logs:
+                replayed, different = replay(events)
+                count += replayed
+                mismatches.extend(different)
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {count} events in {elapsed:.3f}s "
+              f"({count / max(elapsed, 1e-9):.0f} events/s), "
+              f"{len(mismatches)} mismatches")
+        for event in mismatches[:20]:
+            print(f"  {event!r}")
+        sys.exit(1 if mismatches else 0)
@@ -0,0 +1,127 @@
+"""quiz_fuzzy matches typed answers against the accepted Maori names, so
+"Otakou" finds "Ōtākou" and "te whanganui a tara" finds
+"Te Whanganui-a-Tara". Names are indexed once by a normalised form
+(macrons and other accents stripped, case, hyphens and spacing folded) and
+by their letter pairs, so a few typos are forgiven while lookups stay fast
+for vocabularies of tens of thousands of names."""
+
+# Import unicodedata to strip macrons, re to fold punctuation and Counter
+# to count shared letter pairs
+import re
+import unicodedata
+from collections import Counter
+
+_SEPARATORS = re.compile(r"[\s\-‐‑–—_'’`.,]+")
+
+
+# Normalised form of a name: no accents, lower case, words separated by
+# single spaces ("Te Whanganui-a-Tara" -> "te whanganui a tara")
+def normalise(text):
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+# Most typos forgiven in a normalised answer of a given length
+def typo_limit(length):
+    if length <= 3:
+        return 0
+    if length <= 7:
+        return 1
+    return 2
+
+
+# Levenshtein distance between a and b, or limit + 1 once it is certain to
+# be more than limit
+def edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        best = i
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1,
+                       previous[j - 1] + (ca != cb))
+            current.append(cost)
+            if cost < best:
+                best = cost
+        if best > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+# Distinct letter pairs of a word, with ^ and $ marking its ends
+def bigrams(word):
+    padded = f"^{word}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+# Words indexed by their letter pairs. Each edit changes at most two pairs,
+# so a word within k edits of a query shares all but 2k of the query's
+# pairs; counting shared pairs through the inverted index leaves only a
+# handful of candidates to check with edit_distance.
+class BigramIndex(object):
+    def __init__(self, words=()):
+        self.words = []
+        self.postings = {}
+        for word in words:
+            self.add(word)
+
+    # Add a word to the postings of each of its letter pairs
+    def add(self, word):
+        word_id = len(self.words)
+        self.words.append(word)
+        for pair in bigrams(word):
+            self.postings.setdefault(pair, []).append(word_id)
+
+    # Words within max_distance of word, as (distance, word) pairs sorted
+    # by distance
+    def search(self, word, max_distance):
+        pairs = bigrams(word)
+        needed = len(pairs) - 2 * max_distance
+        shared = Counter()
+        for pair in pairs:
+            shared.update(self.postings.get(pair, ()))
+        if needed > 0:
+            candidates = [self.words[word_id]
+                          for word_id, count in shared.items()
+                          if count >= needed]
+        else:
+            candidates = self.words
+
+        found = []
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) <= max_distance:
+                distance = edit_distance(word, candidate, max_distance)
+                if distance <= max_distance:
+                    found.append((distance, candidate))
+        found.sort()
+        return found
+
+
+# Index of accepted names by normalised form, for matching typed answers
+class AnswerIndex(object):
+    def __init__(self, names):
+        self.names = {}
+        for name in names:
+            self.names.setdefault(normalise(name), []).append(name)
+        self.words = BigramIndex(self.names)
+
+    # Names the typed text could mean: exact normalised matches, otherwise
+    # every name at the smallest edit distance within the typo limit
+    def match(self, text, max_distance=None):
+        key = normalise(text)
+        if key in self.names:
+            return list(self.names[key])
+        if max_distance is None:
+            max_distance = typo_limit(len(key))
+        if not key or not max_distance:
+            return []
+        found = self.words.search(key, max_distance)
+        if not found:
+            return []
+        closest = found[0][0]
+        return [name for distance, key in found if distance == closest
+                for name in self.names[key]]
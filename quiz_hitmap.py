@@ -0,0 +1,135 @@
+"""quiz_hitmap turns the coloured map image into a raster of region IDs, so
+a click on any pixel of a region resolves to that region in constant time.
+The raster is decoded once with PIL and NumPy and cached to disk as .npy."""
+
+# Import hashlib and os for the cache file, deque for flood filling
+import hashlib
+import os
+from collections import deque
+
+# Colour the map image paints regions in, keyed by their marker colour
+MAP_PALETTE = {
+    "tan1": (254, 134, 73),
+    "lightgreen": (83, 215, 105),
+    "royalblue1": (21, 126, 251),
+    "gold1": (254, 208, 49),
+    "mediumpurple1": (188, 55, 238),
+}
+
+# Pixels further than this from every palette colour (outlines, shading)
+# belong to no region
+MAX_COLOUR_DISTANCE = 80
+
+# Patches of colour smaller than this are anti-aliasing noise, not regions
+MIN_REGION_PIXELS = 30
+
+# Bump when the raster layout changes so old cache files are ignored
+RASTER_VERSION = 1
+
+CACHE_DIR = ".asset_cache"
+
+
+# Decode the map and label every pixel with a region ID (-1 for none).
+# Each connected patch of one palette colour is given to the nearest
+# marker painted in that colour. markers and colors are lists indexed by
+# region ID holding (x, y) image coordinates and palette keys; regions whose
+# colour is not in MAP_PALETTE are left to their markers.
+def build_region_raster(image_path, markers, colors):
+    import numpy
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        rgba = numpy.asarray(image.convert("RGBA"), dtype=numpy.int32)
+    height, width = rgba.shape[:2]
+
+    palette_keys = sorted(set(colors) & set(MAP_PALETTE))
+    # int16 holds IDs for up to 32767 regions, int32 beyond that
+    dtype = numpy.int16 if len(colors) <= 32767 else numpy.int32
+    if not palette_keys:
+        return numpy.full((height, width), -1, dtype=dtype)
+    palette = numpy.array([MAP_PALETTE[key] for key in palette_keys])
+    distance = ((rgba[:, :, None, :3] - palette[None, None]) ** 2).sum(axis=3)
+    colour = distance.argmin(axis=2)
+    colour[(rgba[:, :, 3] < 128) |
+           (distance.min(axis=2) > MAX_COLOUR_DISTANCE ** 2)] = -1
+
+    candidates = {index: [region for region, key in enumerate(colors)
+                          if key == palette_key]
+                  for index, palette_key in enumerate(palette_keys)}
+    raster = numpy.full((height, width), -1, dtype=dtype)
+    grid = colour.tolist()
+    seen = bytearray(width * height)
+
+    for start_y in range(height):
+        for start_x in range(width):
+            patch_colour = grid[start_y][start_x]
+            if patch_colour < 0 or seen[start_y * width + start_x]:
+                continue
+
+            # Flood fill the patch of this colour
+            seen[start_y * width + start_x] = 1
+            pixels = []
+            pending = deque([(start_x, start_y)])
+            while pending:
+                x, y = pending.popleft()
+                pixels.append((x, y))
+                for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1),
+                               (x, y - 1)):
+                    if (0 <= nx < width and 0 <= ny < height and
+                            not seen[ny * width + nx] and
+                            grid[ny][nx] == patch_colour):
+                        seen[ny * width + nx] = 1
+                        pending.append((nx, ny))
+
+            if len(pixels) < MIN_REGION_PIXELS:
+                continue
+            centre_x = sum(x for x, y in pixels) / len(pixels)
+            centre_y = sum(y for x, y in pixels) / len(pixels)
+            region = min(candidates[patch_colour],
+                         key=lambda r: (markers[r][0] - centre_x) ** 2 +
+                         (markers[r][1] - centre_y) ** 2)
+            xs, ys = zip(*pixels)
+            raster[list(ys), list(xs)] = region
+
+    return raster
+
+
+# Load the region raster from the cache, building and saving it if the
+# image or markers changed since it was last built
+def load_region_raster(image_path, markers, colors, cache_dir=CACHE_DIR):
+    import numpy
+
+    digest = hashlib.sha1()
+    with open(image_path, "rb") as image_file:
+        digest.update(image_file.read())
+    digest.update(repr((RASTER_VERSION, list(markers), list(colors),
+                        MAP_PALETTE)).encode("utf-8"))
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    cache_path = os.path.join(
+        cache_dir, f"{stem}.regions.{digest.hexdigest()[:16]}.npy")
+
+    try:
+        return numpy.load(cache_path)
+    except (OSError, ValueError):
+        pass
+
+    # Write to a file of this process's own and move it into place, so
+    # another quiz starting at the same time never loads half a raster
+    raster = build_region_raster(image_path, markers, colors)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        partial_path = f"{cache_path}.{os.getpid()}.part"
+        with open(partial_path, "wb") as cache_file:
+            numpy.save(cache_file, raster)
+        os.replace(partial_path, cache_path)
+    except OSError:
+        pass
+    return raster
+
+
+# Region ID under an image pixel, or -1 if the pixel is outside every region
+def region_at(raster, x, y):
+    height, width = raster.shape
+    if 0 <= x < width and 0 <= y < height:
+        return int(raster[y, x])
+    return -1
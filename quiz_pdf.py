@@ -0,0 +1,203 @@
+"""quiz_pdf exports quiz results to PDF. reportlab is only imported the
+first time an export (or a pre-warm) needs it, so launching the quiz does
+not pay for it.
+
+Rows are drawn straight onto a reportlab canvas one at a time, so exports
+of tens of thousands of answers do not go through Platypus layout. Text is
+set in a TrueType font with the macron vowels (ā, ē, ī, ō, ū) embedded in
+the PDF; set QUIZ_PDF_FONT to a .ttf file, or put DejaVuSans.ttf in a fonts
+folder next to this module, to choose the font."""
+
+# Import os to find fonts, threading to guard and pre-warm the reportlab
+# import, quiz_trace to time exports
+import os
+import threading
+from types import SimpleNamespace
+
+from quiz_trace import traced
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# TrueType fonts tried in order, as (regular, bold) files; the first one
+# that has every macron vowel is embedded
+FONT_FILES = [
+    (os.path.join(HERE, "fonts", "DejaVuSans.ttf"),
+     os.path.join(HERE, "fonts", "DejaVuSans-Bold.ttf")),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+     "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf",
+     "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf",
+     "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", None),
+    ("/System/Library/Fonts/Supplemental/Arial.ttf",
+     "/System/Library/Fonts/Supplemental/Arial Bold.ttf"),
+    ("C:\\Windows\\Fonts\\arial.ttf", "C:\\Windows\\Fonts\\arialbd.ttf"),
+]
+MACRONS = "ĀāĒēĪīŌōŪū"
+
+# Page layout in points, matching the old Platypus export: one inch
+# margins, an 18pt title, 14pt headings and 10pt rows
+PAGE_MARGIN = 72
+STYLES = {"title": ("bold", 18, 22), "heading": ("bold", 14, 17),
+          "body": ("regular", 10, 12)}
+ROW_SPACE = 7
+
+_reportlab = None
+_reportlab_lock = threading.Lock()
+
+
+# Import the reportlab pieces used for export and register the fonts once,
+# on first use
+def load_reportlab():
+    global _reportlab
+    with _reportlab_lock:
+        if _reportlab is None:
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.utils import simpleSplit
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont, TTFError
+            from reportlab.pdfgen.canvas import Canvas
+
+            fonts = {"regular": "Helvetica", "bold": "Helvetica-Bold"}
+            font_files = list(FONT_FILES)
+            if os.environ.get("QUIZ_PDF_FONT"):
+                font_files.insert(0, (os.environ["QUIZ_PDF_FONT"], None))
+            for regular, bold in font_files:
+                try:
+                    font = TTFont("QuizSans", regular)
+                except (OSError, TTFError):
+                    continue
+                if all(ord(c) in font.face.charToGlyph for c in MACRONS):
+                    pdfmetrics.registerFont(font)
+                    fonts = {"regular": "QuizSans", "bold": "QuizSans"}
+                    try:
+                        pdfmetrics.registerFont(TTFont("QuizSans-Bold", bold))
+                        fonts["bold"] = "QuizSans-Bold"
+                    except (OSError, TTFError, TypeError):
+                        pass
+                    break
+
+            _reportlab = SimpleNamespace(
+                letter=letter, Canvas=Canvas, simpleSplit=simpleSplit,
+                styles={name: (fonts[weight], size, leading)
+                        for name, (weight, size, leading) in STYLES.items()})
+    return _reportlab
+
+
+# Start importing reportlab in a background thread so the first export
+# does not wait for it. Missing reportlab is reported at export time.
+def prewarm_reportlab():
+    def warm():
+        try:
+            load_reportlab()
+        except ImportError:
+            pass
+
+    thread = threading.Thread(target=warm, name="reportlab-prewarm",
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+# Writes wrapped lines of text down the page, starting a new page when the
+# bottom margin is reached. Only the current page is laid out at a time.
+class PdfWriter(object):
+    def __init__(self, filename):
+        self.rl = load_reportlab()
+        self.canvas = self.rl.Canvas(filename, pagesize=self.rl.letter,
+                                     pageCompression=1)
+        self.page_width, self.page_height = self.rl.letter
+        self.line_width = self.page_width - 2 * PAGE_MARGIN
+        self.y = self.page_height - PAGE_MARGIN
+        self.font = None
+        # Wrapped lines of repeated text (e.g. the same region and answers
+        # in many rows) are remembered instead of measured again
+        self.wrapped = {}
+
+    # Draw a paragraph of text in one of STYLES, then leave space_after
+    def write(self, text, style="body", space_after=0):
+        font, size, leading = self.rl.styles[style]
+        lines = self.wrapped.get((text, style))
+        if lines is None:
+            lines = self.rl.simpleSplit(text, font, size, self.line_width)
+            if len(self.wrapped) < 10000:
+                self.wrapped[(text, style)] = lines
+        for line in lines:
+            if self.y - leading < PAGE_MARGIN:
+                self.new_page()
+            self.y -= leading
+            if self.font != (font, size):
+                self.canvas.setFont(font, size)
+                self.font = (font, size)
+            self.canvas.drawString(PAGE_MARGIN, self.y + leading - size,
+                                   line)
+        self.y -= space_after
+
+    # Leave vertical space before the next line
+    def space(self, points):
+        self.y -= points
+
+    # Finish the current page and start a new one
+    def new_page(self):
+        self.canvas.showPage()
+        self.font = None
+        self.y = self.page_height - PAGE_MARGIN
+
+    # Write the file
+    def save(self):
+        self.canvas.save()
+
+
+# Write the summary and detailed answers of one quiz to a PDF file.
+# quiz_history can be any iterable of history entries; reverse questions
+# are listed by the Maori name that was asked.
+@traced
+def write_results_pdf(filename, correct_answers, incorrect_answers,
+                      accuracy, quiz_history):
+    pdf = PdfWriter(filename)
+    pdf.write("Aotearoa Names Quiz Results", "title", space_after=14)
+    pdf.write(f"Final Score: Correct Answers: {correct_answers}, "
+              f"Incorrect Answers: {incorrect_answers}, "
+              f"Percentage: {accuracy:.2f}%", space_after=14)
+
+    pdf.write("Detailed Results:", "heading", space_after=6)
+    for entry in quiz_history:
+        if entry.get("direction") == "reverse":
+            asked = f"Maori Name: {entry['prompt']}"
+        else:
+            asked = f"Region: {entry['region']}"
+        pdf.write(f"{asked}, Correct Answer: "
+                  f"{entry['correct_answer']}, User Answer: "
+                  f"{entry['user_answer']}, "
+                  f"{'Correct' if entry['correct'] else 'Incorrect'}",
+                  space_after=ROW_SPACE)
+
+    pdf.save()
+    return filename
+
+
+# Write a class summary PDF: per-student totals and per-region accuracy.
+# students and regions are lists of dicts with answers and correct counts
+# (plus "student" and "sessions", or "region").
+def write_summary_pdf(filename, title, students, regions):
+    pdf = PdfWriter(filename)
+    pdf.write(title, "title", space_after=14)
+
+    pdf.write("Students:", "heading", space_after=6)
+    for row in students:
+        accuracy = row["correct"] / max(row["answers"], 1) * 100
+        pdf.write(f"{row['student'] or 'Unnamed'}: {row['sessions']} "
+                  f"quizzes, {row['correct']} of {row['answers']} answers "
+                  f"correct, Percentage: {accuracy:.2f}%", space_after=2)
+    pdf.space(14)
+
+    pdf.write("Regions:", "heading", space_after=6)
+    for row in regions:
+        accuracy = row["correct"] / max(row["answers"], 1) * 100
+        pdf.write(f"Region: {row['region']}, {row['correct']} of "
+                  f"{row['answers']} answers correct, "
+                  f"Percentage: {accuracy:.2f}%", space_after=2)
+
+    pdf.save()
+    return filename
@@ -0,0 +1,132 @@
+"""quiz_reports writes PDF reports for many stored quiz sessions at once: one
+PDF per session, named after the student, plus a class summary. Sessions
+with no answers (a quiz opened and closed without playing) are left out of
+both. Reports are rendered in parallel across CPU cores with a process
+pool.
+
+    python quiz_reports.py --db quiz_results.db --since 2026-07-20
+
+Report file names depend only on the stored session, so exporting the same
+term twice produces the same files."""
+
+# Import concurrent.futures for the process pool, quiz_pdf for rendering
+# and quiz_store for the stored sessions
+import argparse
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import quiz_pdf
+import quiz_store
+
+SUMMARY_FILENAME = "class_summary.pdf"
+
+
+# File-name friendly version of a student's name ("Ānaru Te Ao" ->
+# "anaru-te-ao")
+def slugify(name):
+    text = unicodedata.normalize("NFKD", name or "")
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-") or "unnamed"
+
+
+# Report file name for a stored session: student, start time (UTC) and the
+# start of the session id, e.g. "aroha_20260720-091500_3f2a9c1d.pdf"
+def report_filename(session):
+    started = time.strftime("%Y%m%d-%H%M%S",
+                            time.gmtime(session["started_at"]))
+    return f"{slugify(session['student'])}_{started}_{session['id'][:8]}.pdf"
+
+
+# Render one session report in a worker process; job is (path, history)
+def render_report(job):
+    path, history = job
+    correct = sum(entry["correct"] for entry in history)
+    accuracy = correct / max(len(history), 1) * 100
+    return quiz_pdf.write_results_pdf(path, correct, len(history) - correct,
+                                      accuracy, history)
+
+
+# Render the class summary in a worker process
+def render_summary(job):
+    return quiz_pdf.write_summary_pdf(*job)
+
+
+# Per-student and per-region totals over the sessions being exported
+def summarise(sessions, histories):
+    students = {}
+    regions = {}
+    for session in sessions:
+        history = histories.get(session["id"], [])
+        totals = students.setdefault(session["student"], {
+            "student": session["student"], "sessions": 0, "answers": 0,
+            "correct": 0})
+        totals["sessions"] += 1
+        totals["answers"] += len(history)
+        for entry in history:
+            totals["correct"] += entry["correct"]
+            region = regions.setdefault(entry["region"], {
+                "region": entry["region"], "answers": 0, "correct": 0})
+            region["answers"] += 1
+            region["correct"] += entry["correct"]
+    return (sorted(students.values(), key=lambda row: row["student"] or ""),
+            sorted(regions.values(), key=lambda row: row["region"]))
+
+
+# Write a PDF for every stored session with at least one answer (optionally
+# for one student or since a timestamp) and a class summary into
+# output_dir, using a process pool of workers processes (default: one per
+# core). Returns the written paths.
+def export_reports(store, output_dir, student=None, since=None, workers=None):
+    histories = store.histories(student, since)
+    sessions = sorted((session for session in store.sessions(student, since)
+                       if session["id"] in histories),
+                      key=lambda session: (session["started_at"],
+                                           session["id"]))
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [(os.path.join(output_dir, report_filename(session)),
+             histories.get(session["id"], [])) for session in sessions]
+    title = "Aotearoa Names Quiz Class Summary"
+    if since is not None:
+        title += time.strftime(" since %d %B %Y", time.localtime(since))
+    summary_job = (os.path.join(output_dir, SUMMARY_FILENAME), title,
+                   *summarise(sessions, histories))
+
+    # Hand each worker several reports at a time so pickling and scheduling
+    # stay small next to rendering
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summary = executor.submit(render_summary, summary_job)
+        paths = list(executor.map(render_report, jobs, chunksize=chunksize))
+        paths.append(summary.result())
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export quiz reports to PDF")
+    parser.add_argument("--db", default=quiz_store.DB_PATH)
+    parser.add_argument("--out", default="reports",
+                        help="folder to write the PDF files to")
+    parser.add_argument("--student", help="only this student's sessions")
+    parser.add_argument("--since", help="only sessions started on or after "
+                                        "this date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    since = None
+    if args.since:
+        since = time.mktime(time.strptime(args.since, "%Y-%m-%d"))
+    results_store = quiz_store.ResultsStore(args.db)
+    try:
+        start = time.perf_counter()
+        written = export_reports(results_store, args.out, args.student,
+                                 since, args.workers)
+        elapsed = time.perf_counter() - start
+    finally:
+        results_store.close()
+    print(f"Wrote {len(written)} reports to {args.out} in {elapsed:.1f}s")
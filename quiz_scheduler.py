@@ -0,0 +1,105 @@
+"""quiz_scheduler picks which region to ask next so a learner sees the
+regions they struggle with more often. Each region is a card with a review
+interval that grows when it is answered correctly and shrinks when it is
+missed; cards sit in a heap keyed on their due time, so picking the next
+card and recording an answer are both O(log n) even for decks of tens of
+thousands of place names."""
+
+# Import heapq for the priority queue, math and time for recall estimates
+import heapq
+import math
+import time
+
+# Review intervals in seconds after the first and second correct answers
+FIRST_INTERVAL = 60
+SECOND_INTERVAL = 10 * 60
+
+# Interval after a miss, so the card comes back soon
+RELEARN_INTERVAL = 30
+
+# Ease factor multiplies the interval after each further correct answer
+START_EASE = 2.5
+MIN_EASE = 1.3
+
+
+# Review state of one region
+class Card(object):
+    __slots__ = ("interval", "ease", "due", "reviewed", "streak", "lapses",
+                 "entry")
+
+    def __init__(self, due):
+        self.interval = 0
+        self.ease = START_EASE
+        self.due = due
+        self.reviewed = None
+        self.streak = 0
+        self.lapses = 0
+        self.entry = None
+
+
+# Spaced-repetition scheduler over a deck of regions. Cards are kept in a
+# heap of (due, sequence, region) entries; recording an answer pushes a new
+# entry and marks the old one stale, and stale entries are dropped when
+# they reach the top (or when stale entries outnumber live ones).
+class SpacedRepetitionScheduler(object):
+    def __init__(self, regions, clock=time.time):
+        self.clock = clock
+        self.cards = {}
+        self.heap = []
+        self.sequence = 0
+        now = clock()
+        for region in regions:
+            card = Card(now)
+            self.cards[region] = card
+            card.entry = (now, self.sequence, region)
+            self.heap.append(card.entry)
+            self.sequence += 1
+        heapq.heapify(self.heap)
+
+    # Region whose review is due soonest (new regions in deck order first)
+    def next_region(self):
+        heap = self.heap
+        while heap[0] is not self.cards[heap[0][2]].entry:
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    # Update a region's card after an answer and reschedule it
+    def record(self, region, correct, now=None):
+        now = self.clock() if now is None else now
+        card = self.cards[region]
+        if correct:
+            card.streak += 1
+            if card.streak == 1:
+                card.interval = FIRST_INTERVAL
+            elif card.streak == 2:
+                card.interval = SECOND_INTERVAL
+            else:
+                card.interval *= card.ease
+            card.ease += 0.1
+        else:
+            card.streak = 0
+            card.lapses += 1
+            card.interval = RELEARN_INTERVAL
+            card.ease = max(MIN_EASE, card.ease - 0.2)
+        card.reviewed = now
+        card.due = now + card.interval
+
+        card.entry = (card.due, self.sequence, region)
+        self.sequence += 1
+        heapq.heappush(self.heap, card.entry)
+        if len(self.heap) > 2 * len(self.cards):
+            self.compact()
+
+    # Rebuild the heap from live entries only
+    def compact(self):
+        self.heap = [card.entry for card in self.cards.values()]
+        heapq.heapify(self.heap)
+
+    # Estimated chance the learner still remembers a region, decaying
+    # exponentially with the time since it was last reviewed
+    def recall_probability(self, region, now=None):
+        card = self.cards[region]
+        if card.reviewed is None or not card.streak:
+            return 0.0
+        now = self.clock() if now is None else now
+        return math.exp(-(now - card.reviewed) / card.interval)
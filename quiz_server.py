@@ -0,0 +1,357 @@
+"""quiz_server hosts many Aotearoa quiz sessions in one process over a small
+HTTP/JSON API, so the quiz can be played from browsers and thin clients.
+Every session is a QuizEngine sharing one region table and distractor index.
+
+    python quiz_server.py --port 8765 --db quiz_results.db
+
+    POST   /sessions                 {"student": "Aroha"} start a session
+                                     (optionally with {"seed": 42} and
+                                     {"direction": "reverse" or "mixed"})
+    GET    /sessions/<id>            scores, answered regions, open question
+    POST   /sessions/<id>/question   {"region": "Otago"} -> question, options
+                                     (409 while another question is open)
+    POST   /sessions/<id>/answer     {"answer": "Ōtākou"} -> result
+                                     ({"typed": "otakou"} for free text)
+    POST   /sessions/<id>/close      close the open question
+    POST   /sessions/<id>/reset      start the quiz again ({"seed": 42})
+    DELETE /sessions/<id>            end the session
+"""
+
+# Import asyncio for the server, json for messages, secrets for session
+# ids, logging to report requests that fail unexpectedly
+import argparse
+import asyncio
+import json
+import logging
+import secrets
+import time
+
+from quiz_engine import REGIONS, DIRECTIONS, DistractorIndex, QuizEngine
+from quiz_fuzzy import AnswerIndex
+import quiz_store
+
+# Sessions untouched for this many seconds are dropped
+SESSION_TTL = 2 * 60 * 60
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request",
+               404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+               413: "Payload Too Large",
+               431: "Request Header Fields Too Large",
+               500: "Internal Server Error"}
+
+logger = logging.getLogger(__name__)
+
+
+# Error returned to the client as a JSON body with an HTTP status
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# All quiz sessions in this process and the request handling for them.
+# With a ResultsStore, every session and answer is also saved to SQLite.
+class QuizServer(object):
+    def __init__(self, regions=None, option_count=3, store=None):
+        self.regions = regions if regions is not None else REGIONS
+        self.distractors = DistractorIndex(self.regions)
+        self.reverse_distractors = DistractorIndex(self.regions, reverse=True)
+        self.answer_index = AnswerIndex(
+            name for names in self.regions.values() for name in names)
+        self.region_index = AnswerIndex(self.regions)
+        self.option_count = option_count
+        self.store = store
+        self.sessions = {}
+        self.last_used = {}
+        self.students = {}
+        self.stored_ids = {}
+
+    # Start a new session sharing the region table, distractor indexes and
+    # typed-answer indexes, with its own random generator (seeded with seed,
+    # if given)
+    def create_session(self, student=None, seed=None, direction="forward"):
+        session_id = secrets.token_hex(8)
+        engine = QuizEngine(self.regions, self.distractors,
+                            self.option_count,
+                            answer_index=self.answer_index,
+                            direction=direction,
+                            reverse_distractors=self.reverse_distractors,
+                            region_index=self.region_index)
+        if seed is not None:
+            engine.reset(seed)
+        self.sessions[session_id] = engine
+        self.last_used[session_id] = time.monotonic()
+        self.students[session_id] = student
+        self.start_stored_session(session_id)
+        return session_id
+
+    # Start a stored session for a (new or reset) quiz session
+    def start_stored_session(self, session_id):
+        if self.store is not None:
+            self.stored_ids[session_id] = self.store.start_session(
+                len(self.regions), self.students[session_id])
+
+    # Forget a session
+    def remove_session(self, session_id):
+        del self.sessions[session_id]
+        del self.last_used[session_id]
+        del self.students[session_id]
+        self.stored_ids.pop(session_id, None)
+
+    # Drop sessions that have not been used within SESSION_TTL
+    def expire_sessions(self, now=None):
+        cutoff = (now if now is not None else time.monotonic()) - SESSION_TTL
+        for session_id in [session_id for session_id, used
+                           in self.last_used.items() if used < cutoff]:
+            self.remove_session(session_id)
+
+    # Summary of a session's scores and open question
+    def session_state(self, session_id, engine):
+        return {"session": session_id,
+                "correct_answers": engine.correct_answers,
+                "incorrect_answers": engine.incorrect_answers,
+                "answered_regions": sorted(engine.answered_regions),
+                "state": engine.state_key(),
+                "total_questions": engine.total_questions,
+                "current_region": engine.current_region,
+                "direction": engine.direction,
+                "current_question": (engine.question_text()
+                                     if engine.current_region else None),
+                "current_options": engine.current_options,
+                "seed": engine.seed,
+                "finished": engine.is_finished()}
+
+    # Handle one request, returning (status, JSON-serialisable payload)
+    def handle_request(self, method, path, body):
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+        if parts == ["sessions"]:
+            if method != "POST":
+                raise RequestError(405, "use POST to start a session")
+            data = read_json(body)
+            student = data.get("student")
+            if student is not None and not isinstance(student, str):
+                raise RequestError(400, "student must be a string")
+            direction = data.get("direction", "forward")
+            if direction not in DIRECTIONS:
+                raise RequestError(400, "direction must be one of " +
+                                   ", ".join(DIRECTIONS))
+            session_id = self.create_session(student, read_seed(data),
+                                             direction)
+            return 201, {"session": session_id,
+                         "seed": self.sessions[session_id].seed,
+                         "regions": list(self.regions),
+                         "total_questions": len(self.regions)}
+
+        if not parts or parts[0] != "sessions" or len(parts) > 3:
+            raise RequestError(404, "unknown path")
+        session_id = parts[1]
+        engine = self.sessions.get(session_id)
+        if engine is None:
+            raise RequestError(404, "unknown session")
+        self.last_used[session_id] = time.monotonic()
+        action = parts[2] if len(parts) == 3 else None
+
+        if action is None and method == "GET":
+            return 200, self.session_state(session_id, engine)
+        if action is None and method == "DELETE":
+            self.remove_session(session_id)
+            return 200, {"session": session_id, "deleted": True}
+        if method != "POST" or action is None:
+            raise RequestError(405, "method not allowed")
+
+        if action == "question":
+            region = read_json(body).get("region")
+            if not isinstance(region, str) or region not in engine.regions:
+                raise RequestError(400, "unknown region")
+            if engine.is_answered(region):
+                raise RequestError(409, "region already answered")
+            if engine.current_region is not None:
+                raise RequestError(409, "a question is already open")
+            options = engine.show_question(region)
+            return 200, {"region": region,
+                         "question": engine.question_text(),
+                         "options": options}
+        if action == "answer":
+            data = read_json(body)
+            if engine.current_region is None:
+                raise RequestError(409, "no question is open")
+            if "typed" in data:
+                if not isinstance(data["typed"], str):
+                    raise RequestError(400, "typed must be a string")
+                correct = engine.check_typed_answer(data["typed"])
+            else:
+                answer = data.get("answer")
+                if answer is not None and not isinstance(answer, str):
+                    raise RequestError(400, "answer must be a string")
+                correct = engine.check_answer(answer)
+            entry = engine.quiz_history[-1]
+            if self.store is not None:
+                stored_id = self.stored_ids[session_id]
+                self.store.record_answer(stored_id, entry)
+                if engine.is_finished():
+                    self.store.finish_session(stored_id,
+                                              engine.correct_answers,
+                                              engine.incorrect_answers,
+                                              state=engine.state_key())
+            return 200, {"correct": correct,
+                         "region": entry["region"],
+                         "correct_answer": entry["correct_answer"],
+                         "correct_answers": engine.correct_answers,
+                         "incorrect_answers": engine.incorrect_answers,
+                         "finished": engine.is_finished()}
+        if action == "close":
+            engine.close_question()
+            return 200, self.session_state(session_id, engine)
+        if action == "reset":
+            engine.reset(read_seed(read_json(body)))
+            self.start_stored_session(session_id)
+            return 200, self.session_state(session_id, engine)
+        raise RequestError(404, "unknown action")
+
+    # Serve HTTP/1.1 requests on one connection until the client leaves.
+    # A request line or header longer than the reader's limit gets a 431,
+    # and an unexpected error in a handler a 500; both close the connection.
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request_head(reader)
+                except ValueError:
+                    await send_response(writer, 431,
+                                        {"error": "request line or header "
+                                                  "too long"}, False)
+                    break
+                if request is None:
+                    break
+                method, path, version, headers = request
+
+                length = read_content_length(headers)
+                keep_alive = (headers.get("connection", "").lower() !=
+                              "close" and version == "HTTP/1.1")
+                if length is None:
+                    status, payload = 400, {"error": "bad Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "request too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = self.handle_request(method, path,
+                                                              body)
+                    except RequestError as e:
+                        status, payload = e.status, {"error": str(e)}
+                    except Exception:
+                        logger.exception("error handling %s %s", method,
+                                         path)
+                        status, payload = 500, {"error": "internal error"}
+                        keep_alive = False
+
+                await send_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # Drop idle sessions every few minutes while the server runs
+    async def expire_forever(self, interval=300):
+        while True:
+            await asyncio.sleep(interval)
+            self.expire_sessions()
+
+    # Start listening and return the asyncio server
+    async def start(self, host="127.0.0.1", port=8765):
+        self.expiry_task = asyncio.ensure_future(self.expire_forever())
+        return await asyncio.start_server(self.handle_connection, host, port,
+                                          backlog=1024)
+
+
+# Read a request line and headers, returning (method, path, version,
+# headers), or None when the client has gone or sent something that is not
+# HTTP. Raises ValueError for a line longer than the reader's limit.
+async def read_request_head(reader):
+    request_line = await reader.readline()
+    try:
+        method, path, version = request_line.decode("latin-1").split()
+    except ValueError:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method, path, version, headers
+
+
+# Write a JSON response
+async def send_response(writer, status, payload, keep_alive):
+    data = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        f"\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+
+
+# Body length from the Content-Length header (0 if there is none), or None
+# if it is not a non-negative integer
+def read_content_length(headers):
+    value = headers.get("content-length") or "0"
+    try:
+        length = int(value)
+    except ValueError:
+        return None
+    return length if length >= 0 else None
+
+
+# Decode a JSON request body into a dict
+def read_json(body):
+    try:
+        data = json.loads(body.decode("utf-8")) if body else {}
+    except (UnicodeDecodeError, ValueError):
+        raise RequestError(400, "body must be JSON")
+    if not isinstance(data, dict):
+        raise RequestError(400, "body must be a JSON object")
+    return data
+
+
+# Optional seed from a request body, a non-negative 64-bit integer
+def read_seed(data):
+    seed = data.get("seed")
+    if seed is not None and (type(seed) is not int or
+                             not 0 <= seed < 2 ** 64):
+        raise RequestError(400, "seed must be a non-negative 64-bit integer")
+    return seed
+
+
+# Run the server until interrupted
+async def serve(host, port, store=None):
+    server = await QuizServer(store=store).start(host, port)
+    print(f"Aotearoa quiz server listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aotearoa quiz server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", help="SQLite file to save results to")
+    args = parser.parse_args()
+    results_store = quiz_store.ResultsStore(args.db) if args.db else None
+    try:
+        asyncio.run(serve(args.host, args.port, results_store))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if results_store is not None:
+            results_store.close()
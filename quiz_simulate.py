@@ -0,0 +1,218 @@
+"""quiz_simulate plays millions of simulated quiz sessions at once with
+NumPy, to show the score distribution of a learner model and how hard each
+region and each wrong answer (distractor) makes a question. Options are
+sampled the way QuizEngine samples them (distinct distractors from the
+shared pool, never a name of the region being asked, fewer options when a
+region has too few distractors), in batches of whole sessions.
+
+    python quiz_simulate.py --sessions 1000000 --model elimination --know 0.4
+
+Learner models:
+    guess        picks one of the options at random
+    knowledge    knows each region with probability --know and answers it
+                 correctly, otherwise guesses
+    elimination  like knowledge, but also rules out distractors that are
+                 names of regions it knows before guessing
+"""
+
+# Import numpy for the batched sampling and quiz_engine for the region
+# table and distractor pool
+import argparse
+import secrets
+import time
+
+import numpy
+
+from quiz_engine import REGIONS, DistractorIndex, spawn_seeds
+
+LEARNER_MODELS = ("guess", "knowledge", "elimination")
+
+# Sessions simulated per batch; bounds memory to a few tens of MB
+BATCH_SIZE = 100000
+
+
+# Region table and distractor pool as arrays: for each region the pool
+# indices it may draw distractors from, and for each pool name the region
+# it belongs to
+class DeckArrays(object):
+    def __init__(self, regions=None, distractors=None):
+        regions = regions if regions is not None else REGIONS
+        distractors = distractors or DistractorIndex(regions)
+        self.region_names = list(regions)
+        self.pool = distractors.pool
+
+        allowed = [[index for index, name in enumerate(self.pool)
+                    if name not in distractors.excluded[region]]
+                   for region in self.region_names]
+        self.allowed_counts = numpy.array([len(ids) for ids in allowed])
+        self.allowed = numpy.zeros(
+            (len(allowed), max(1, self.allowed_counts.max())),
+            dtype=numpy.int32)
+        for region_id, ids in enumerate(allowed):
+            self.allowed[region_id, :len(ids)] = ids
+
+        owners = {}
+        for region_id, region in enumerate(self.region_names):
+            for name in regions[region]:
+                owners.setdefault(name, region_id)
+        self.owner = numpy.array([owners[name] for name in self.pool],
+                                 dtype=numpy.int32)
+
+
+# Totals over all simulated sessions
+class SimulationResult(object):
+    def __init__(self, deck, sessions, histogram, region_errors,
+                 offered, picked):
+        self.deck = deck
+        self.sessions = sessions
+        # histogram[n] is the number of sessions scoring n correct answers
+        self.histogram = histogram
+        self.region_errors = region_errors
+        self.offered = offered
+        self.picked = picked
+
+    # Mean number of correct answers per session
+    def mean_score(self):
+        scores = numpy.arange(len(self.histogram))
+        return float((scores * self.histogram).sum() / self.sessions)
+
+    # Fraction of questions on each region answered wrongly
+    def region_error_rates(self):
+        return dict(zip(self.deck.region_names,
+                        (self.region_errors / self.sessions).tolist()))
+
+    # For each distractor, the fraction of times it was offered that it was
+    # picked
+    def distractor_pick_rates(self):
+        rates = self.picked / numpy.maximum(self.offered, 1)
+        return dict(zip(self.deck.pool, rates.tolist()))
+
+
+# Choose k distinct distractors per question, uniformly from each region's
+# allowed pool, for an (n, regions) batch. Returns the (n, regions, k) pool
+# indices and a mask of the slots that hold one: a region with fewer than
+# k allowed distractors gets them all, as QuizEngine offers fewer options.
+def sample_distractors(deck, rng, n, k):
+    counts = deck.allowed_counts[numpy.newaxis, :]
+    valid = numpy.broadcast_to(
+        counts[:, :, numpy.newaxis] > numpy.arange(k),
+        (n, len(deck.region_names), k))
+    chosen = numpy.empty((n, len(deck.region_names), k), dtype=numpy.int32)
+    for j in range(k):
+        # Draw from the allowed slots left after the j already chosen, then
+        # step past each chosen slot (in ascending order) at or below it
+        slot = (rng.random((n, counts.shape[1])) *
+                numpy.maximum(counts - j, 1)).astype(numpy.int32)
+        for previous in numpy.sort(chosen[:, :, :j], axis=2).transpose(
+                2, 0, 1):
+            slot += slot >= previous
+        chosen[:, :, j] = slot
+    chosen[~valid] = 0
+    region_ids = numpy.arange(len(deck.region_names))[numpy.newaxis, :,
+                                                      numpy.newaxis]
+    return deck.allowed[region_ids, chosen], valid
+
+
+# Simulate sessions with a learner model and return a SimulationResult.
+# know is the chance of knowing each region: one number, or one per region.
+# Each batch draws from its own generator, seeded with spawn_seeds(seed), so
+# batches are independent streams and the same seed gives the same result
+# whichever order (or worker process) the batches run in.
+def simulate(sessions, model="guess", know=0.5, option_count=3, seed=None,
+             deck=None, batch_size=BATCH_SIZE):
+    if model not in LEARNER_MODELS:
+        raise ValueError(f"unknown learner model: {model}")
+    if option_count < 1:
+        raise ValueError("option_count must be at least 1")
+    deck = deck or DeckArrays()
+    if seed is None:
+        seed = secrets.randbits(64)
+    batch_seeds = spawn_seeds(seed, -(-sessions // batch_size))
+    region_count = len(deck.region_names)
+    k = option_count - 1
+    know = 0.0 if model == "guess" else numpy.asarray(know, dtype=float)
+
+    histogram = numpy.zeros(region_count + 1, dtype=numpy.int64)
+    region_errors = numpy.zeros(region_count, dtype=numpy.int64)
+    offered = numpy.zeros(len(deck.pool), dtype=numpy.int64)
+    picked = numpy.zeros(len(deck.pool), dtype=numpy.int64)
+
+    remaining = sessions
+    for batch_seed in batch_seeds:
+        rng = numpy.random.default_rng(batch_seed)
+        n = min(remaining, batch_size)
+        remaining -= n
+        distractors, offered_slot = sample_distractors(deck, rng, n, k)
+        known = rng.random((n, region_count)) < know
+
+        # Options still in play: the correct answer plus every distractor
+        # offered and not ruled out. The guess is an index into them, 0
+        # being correct.
+        if model == "elimination":
+            in_play = offered_slot & ~known[
+                numpy.arange(n)[:, numpy.newaxis, numpy.newaxis],
+                deck.owner[distractors]]
+        else:
+            in_play = offered_slot.copy()
+        position = numpy.cumsum(in_play, axis=2)
+        guess = (rng.random((n, region_count)) *
+                 (in_play.sum(axis=2) + 1)).astype(numpy.int32)
+        correct = known | (guess == 0)
+
+        chosen_slot = in_play & (position == guess[:, :, numpy.newaxis])
+        chosen_slot &= ~correct[:, :, numpy.newaxis]
+
+        histogram += numpy.bincount(correct.sum(axis=1),
+                                    minlength=region_count + 1)
+        region_errors += n - correct.sum(axis=0)
+        offered += numpy.bincount(distractors[offered_slot],
+                                  minlength=len(deck.pool))
+        picked += numpy.bincount(distractors[chosen_slot],
+                                 minlength=len(deck.pool))
+
+    return SimulationResult(deck, sessions, histogram, region_errors,
+                            offered, picked)
+
+
+# Print a score histogram and the hardest regions and distractors
+def print_report(result, top=10):
+    print(f"{result.sessions} sessions, mean score "
+          f"{result.mean_score():.2f} of {len(result.histogram) - 1}")
+    peak = max(result.histogram.max(), 1)
+    for score, count in enumerate(result.histogram.tolist()):
+        share = count / result.sessions
+        print(f"  {score:3d} correct {share:8.2%} "
+              f"{'#' * round(50 * count / peak)}")
+
+    print("Error rate by region:")
+    for region, rate in sorted(result.region_error_rates().items(),
+                               key=lambda item: -item[1]):
+        print(f"  {region:<25} {rate:7.2%}")
+
+    print(f"Most often picked distractors (top {top}):")
+    rates = sorted(result.distractor_pick_rates().items(),
+                   key=lambda item: -item[1])
+    for name, rate in rates[:top]:
+        print(f"  {name:<25} {rate:7.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate quiz sessions")
+    parser.add_argument("--sessions", type=int, default=1000000)
+    parser.add_argument("--model", choices=LEARNER_MODELS, default="guess")
+    parser.add_argument("--know", type=float, default=0.5,
+                        help="chance the learner knows each region")
+    parser.add_argument("--options", type=int, default=3,
+                        help="answer options per question")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    if args.options < 1:
+        parser.error("--options must be at least 1")
+
+    start = time.perf_counter()
+    simulation = simulate(args.sessions, args.model, args.know, args.options,
+                          args.seed)
+    elapsed = time.perf_counter() - start
+    print_report(simulation)
+    print(f"Simulated in {elapsed:.2f}s "
+          f"({args.sessions / elapsed:,.0f} sessions/s)")
@@ -0,0 +1,238 @@
+"""quiz_store keeps every quiz session and answer in a local SQLite database,
+so classroom results outlive the window. Writes are queued and committed in
+batches by a background thread, so callers (the Tk event loop, the quiz
+server) never wait on the disk."""
+
+# Import queue and threading for the writer, sqlite3 for storage, logging
+# to report writes that fail
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+DB_PATH = "quiz_results.db"
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    student TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    total_questions INTEGER NOT NULL,
+    correct_answers INTEGER NOT NULL DEFAULT 0,
+    incorrect_answers INTEGER NOT NULL DEFAULT 0,
+    state TEXT
+);
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions (id),
+    region TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    user_answer TEXT,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL,
+    direction TEXT,
+    prompt TEXT
+);
+CREATE INDEX IF NOT EXISTS answers_region ON answers (region);
+CREATE INDEX IF NOT EXISTS answers_answered_at ON answers (answered_at);
+CREATE INDEX IF NOT EXISTS answers_session ON answers (session_id);
+CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_student ON sessions (student);
+"""
+
+# Statements run by the writer thread, keyed by the kind of queued write.
+# The SQL text never changes, so sqlite3 reuses the prepared statements.
+STATEMENTS = {
+    "session": "INSERT INTO sessions (id, student, started_at, "
+               "total_questions) VALUES (?, ?, ?, ?)",
+    "answer": "INSERT INTO answers (session_id, region, correct_answer, "
+              "user_answer, correct, answered_at, direction, prompt) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "finish": "UPDATE sessions SET finished_at = ?, correct_answers = ?, "
+              "incorrect_answers = ?, state = ? WHERE id = ?",
+}
+
+
+# Open a connection with the settings used for both reading and writing
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# SQLite results store; record_* calls only queue work for the writer thread
+class ResultsStore(object):
+    def __init__(self, path=DB_PATH, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = queue.Queue()
+        connection = connect(path)
+        with connection:
+            connection.executescript(SCHEMA)
+            # Databases from before the state column was added
+            columns = {row["name"] for row in
+                       connection.execute("PRAGMA table_info(sessions)")}
+            if "state" not in columns:
+                connection.execute(
+                    "ALTER TABLE sessions ADD COLUMN state TEXT")
+            # and before answers kept the question direction and prompt
+            columns = {row["name"] for row in
+                       connection.execute("PRAGMA table_info(answers)")}
+            for column in ("direction", "prompt"):
+                if column not in columns:
+                    connection.execute(
+                        f"ALTER TABLE answers ADD COLUMN {column} TEXT")
+        connection.close()
+        self.writer = threading.Thread(target=self._write_batches,
+                                       name="results-writer", daemon=True)
+        self.writer.start()
+
+    # Start recording a session and return its id
+    def start_session(self, total_questions, student=None, started_at=None):
+        session_id = uuid.uuid4().hex
+        self.pending.put(("session", (
+            session_id, student, started_at or time.time(),
+            total_questions)))
+        return session_id
+
+    # Record one answer, given a quiz_history entry
+    def record_answer(self, session_id, entry, answered_at=None):
+        self.pending.put(("answer", (
+            session_id, entry["region"], entry["correct_answer"],
+            entry["user_answer"], int(entry["correct"]),
+            answered_at or time.time(), entry.get("direction"),
+            entry.get("prompt"))))
+
+    # Record the final scores of a session, and optionally its answered and
+    # correct regions as a QuizEngine.state_key()
+    def finish_session(self, session_id, correct_answers, incorrect_answers,
+                       finished_at=None, state=None):
+        self.pending.put(("finish", (
+            finished_at or time.time(), correct_answers, incorrect_answers,
+            state, session_id)))
+
+    # Wait until everything queued so far is committed
+    def flush(self):
+        self.pending.join()
+
+    # Commit outstanding writes and stop the writer thread
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+
+    # Writer thread: take whatever is queued (up to batch_size), run it in
+    # one transaction with executemany per run of same-kind writes, repeat.
+    # If the batch fails it is run again one write at a time, so only the
+    # writes that fail themselves are lost (and logged).
+    def _write_batches(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            taken = len(batch)
+            if None in batch:
+                running = False
+                batch = batch[:batch.index(None)]
+
+            try:
+                with connection:
+                    start = 0
+                    while start < len(batch):
+                        kind = batch[start][0]
+                        end = start
+                        while end < len(batch) and batch[end][0] == kind:
+                            end += 1
+                        connection.executemany(
+                            STATEMENTS[kind],
+                            [params for _, params in batch[start:end]])
+                        start = end
+            except sqlite3.Error:
+                self._write_each(connection, batch)
+            for _ in range(taken):
+                self.pending.task_done()
+        connection.close()
+
+    # Run a batch one write at a time in one transaction, logging and
+    # skipping the writes that fail
+    def _write_each(self, connection, batch):
+        try:
+            with connection:
+                for kind, params in batch:
+                    try:
+                        connection.execute(STATEMENTS[kind], params)
+                    except sqlite3.Error as e:
+                        logger.error("could not save %s %r: %s", kind,
+                                     params, e)
+        except sqlite3.Error as e:
+            logger.error("could not save %d results: %s", len(batch), e)
+
+    # Stored sessions, newest first, optionally for one student or since a
+    # timestamp
+    def sessions(self, student=None, since=None):
+        query = "SELECT * FROM sessions WHERE 1 = 1"
+        params = []
+        if student is not None:
+            query += " AND student = ?"
+            params.append(student)
+        if since is not None:
+            query += " AND started_at >= ?"
+            params.append(since)
+        query += " ORDER BY started_at DESC"
+        return self._read(query, params)
+
+    # Answers of one session in the order they were given, as history entries
+    def answers(self, session_id):
+        rows = self._read("SELECT region, direction, prompt, "
+                          "correct_answer, user_answer, correct, "
+                          "answered_at FROM answers "
+                          "WHERE session_id = ? ORDER BY id", (session_id,))
+        for row in rows:
+            row["correct"] = bool(row["correct"])
+        return rows
+
+    # Answers of every matching session (as for sessions()) in one query,
+    # as a dict of session id to history entries in the order given
+    def histories(self, student=None, since=None):
+        query = ("SELECT a.session_id, a.region, a.direction, a.prompt, "
+                 "a.correct_answer, a.user_answer, a.correct FROM answers a "
+                 "JOIN sessions s ON s.id = a.session_id WHERE 1 = 1")
+        params = []
+        if student is not None:
+            query += " AND s.student = ?"
+            params.append(student)
+        if since is not None:
+            query += " AND s.started_at >= ?"
+            params.append(since)
+        query += " ORDER BY a.id"
+        histories = {}
+        for row in self._read(query, params):
+            row["correct"] = bool(row["correct"])
+            histories.setdefault(row.pop("session_id"), []).append(row)
+        return histories
+
+    # Number of answers and correct answers per region
+    def region_stats(self, since=None):
+        return self._read("SELECT region, COUNT(*) AS answers, "
+                          "SUM(correct) AS correct FROM answers "
+                          "WHERE answered_at >= ? GROUP BY region "
+                          "ORDER BY region", (since or 0,))
+
+    # Run a read query on a short-lived connection, returning dicts
+    def _read(self, query, params):
+        connection = connect(self.path)
+        try:
+            return [dict(row) for row in connection.execute(query, params)]
+        finally:
+            connection.close()
@@ -0,0 +1,72 @@
+"""quiz_trace records when the quiz's handlers run, as a Chrome trace that
+chrome://tracing or ui.perfetto.dev opens as a timeline. Tracing is off
+unless QUIZ_TRACE names the file to write when the quiz exits:
+
+    QUIZ_TRACE=trace.json python 00_developed_component_04.py
+
+The environment is checked once, at import. When tracing is off, @traced
+returns the function itself, so traced handlers cost nothing extra.
+"""
+
+# Import atexit to write the trace on exit, threading for thread IDs
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+TRACE_PATH = os.environ.get("QUIZ_TRACE") or None
+ENABLED = TRACE_PATH is not None
+
+# Complete ("X") events recorded so far, and the names of their threads
+events = []
+thread_names = {}
+_start_ns = time.perf_counter_ns()
+
+
+# Decorator recording each call of a function as a span on its thread's
+# timeline, named after the function (e.g. "AotearoaQuiz.show_question")
+def traced(function):
+    if not ENABLED:
+        return function
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        begin = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            end = time.perf_counter_ns()
+            thread_id = threading.get_ident()
+            if thread_id not in thread_names:
+                thread_names[thread_id] = threading.current_thread().name
+            events.append({"name": name, "cat": "quiz", "ph": "X",
+                           "ts": (begin - _start_ns) / 1000,
+                           "dur": (end - begin) / 1000,
+                           "pid": os.getpid(), "tid": thread_id})
+
+    return wrapper
+
+
+# Write the recorded events as Chrome trace JSON
+def save(path=None):
+    path = path or TRACE_PATH
+    metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(),
+                 "tid": thread_id, "args": {"name": thread_name}}
+                for thread_id, thread_name in list(thread_names.items())]
+    with open(path, "w", encoding="utf-8") as trace_file:
+        json.dump({"traceEvents": metadata + list(events),
+                   "displayTimeUnit": "ms"}, trace_file)
+
+
+# Write the trace when the process that started tracing exits (not in
+# worker processes forked from it)
+def _save_at_exit(pid=os.getpid()):
+    if os.getpid() == pid:
+        save()
+
+
+if ENABLED:
+    atexit.register(_save_at_exit)
@@ -0,0 +1,86 @@
+"""quiz_view is a small retained-mode layer over Tk widget options. The quiz
+says what each widget and canvas item should look like; the view remembers
+what was last sent to Tk and, once per event, sends only the options that
+changed. Asking for every marker to be disabled when most already are
+costs a few dictionary lookups instead of hundreds of Tk calls."""
+
+from quiz_trace import traced
+
+# Marker for options that have never been applied
+_UNSET = object()
+
+
+# Options last applied to each widget or canvas item, and the changes
+# waiting for the next flush. Changes are applied together from one
+# after_idle callback, so several updates in one event cost one Tk call per
+# widget that actually changed.
+class WidgetView(object):
+    def __init__(self, root):
+        self.root = root
+        self.applied = {}
+        self.pending = {}
+        self.targets = {}
+        self.flush_job = None
+        # Tk configure calls made and option changes skipped as unchanged
+        self.calls = 0
+        self.skipped = 0
+
+    # Set options of a widget (as for widget.config)
+    def configure(self, widget, **options):
+        if widget not in self.targets:
+            self.targets[widget] = widget.configure
+        self._update(widget, options)
+
+    # Set options of the canvas items matching a tag or ID (as for
+    # canvas.itemconfig)
+    def itemconfigure(self, canvas, item, **options):
+        self._update(self._item_key(canvas, item), options)
+
+    # Record options a widget was created with, so setting them again
+    # costs no Tk call
+    def assume(self, widget, **options):
+        if widget not in self.targets:
+            self.targets[widget] = widget.configure
+        self.applied.setdefault(widget, {}).update(options)
+
+    # Record options canvas items were created with
+    def assume_item(self, canvas, item, **options):
+        key = self._item_key(canvas, item)
+        self.applied.setdefault(key, {}).update(options)
+
+    def _item_key(self, canvas, item):
+        key = (canvas, item)
+        if key not in self.targets:
+            self.targets[key] = (
+                lambda **changes: canvas.itemconfigure(item, **changes))
+        return key
+
+    # Queue the options that differ from what was last applied; an option
+    # set back to its applied value drops any queued change
+    def _update(self, key, options):
+        applied = self.applied.get(key, {})
+        pending = self.pending.get(key)
+        for name, value in options.items():
+            if applied.get(name, _UNSET) == value:
+                if pending is not None:
+                    pending.pop(name, None)
+                self.skipped += 1
+            else:
+                if pending is None:
+                    pending = self.pending[key] = {}
+                pending[name] = value
+        if self.pending and self.flush_job is None:
+            self.flush_job = self.root.after_idle(self.flush)
+
+    # Apply every queued change now
+    @traced
+    def flush(self):
+        if self.flush_job is not None:
+            self.root.after_cancel(self.flush_job)
+            self.flush_job = None
+        pending, self.pending = self.pending, {}
+        for key, changes in pending.items():
+            if changes:
+                self.targets[key](**changes)
+                self.applied.setdefault(key, {}).update(changes)
+                self.calls += 1
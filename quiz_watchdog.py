@@ -0,0 +1,169 @@
+"""quiz_watchdog notices when the Tk event loop stops responding, e.g. a
+kiosk that "freezes" while a handler blocks. A heartbeat scheduled with
+root.after measures how late each beat runs (a histogram of event-loop lag)
+and a helper thread samples the main thread's Python stack whenever a beat
+is overdue by more than a threshold, so the log shows which handler was
+running. Everything goes to a rotating log file for offline analysis.
+
+    watchdog = StallWatchdog(root, "quiz_watchdog.log")
+    watchdog.start()
+    ...
+    watchdog.stop()
+"""
+
+# Import logging for the rotating log, threading and sys._current_frames
+# for stack samples, traceback to format them
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+import traceback
+
+# Upper edges of the lag histogram buckets in milliseconds; the last bucket
+# holds everything slower
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Rotating log: size of each file and number of old files kept
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+
+
+# Logger writing to a rotating file, set up once per path
+def get_logger(path):
+    logger = logging.getLogger(f"quiz_watchdog.{path}")
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+            encoding="utf-8")
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+# Histogram of event-loop lag: how much later than asked each heartbeat ran
+class LagHistogram(object):
+    def __init__(self):
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.total = 0
+        self.worst = 0.0
+
+    # Count one lag in seconds
+    def add(self, lag):
+        milliseconds = lag * 1000
+        bucket = 0
+        while (bucket < len(LAG_BUCKETS_MS)
+               and milliseconds > LAG_BUCKETS_MS[bucket]):
+            bucket += 1
+        self.counts[bucket] += 1
+        self.total += 1
+        self.worst = max(self.worst, lag)
+
+    # One line for the log, e.g. "<=5ms:1180 <=10ms:12 ... >2500ms:0"
+    def summary(self):
+        buckets = [f"<={edge}ms:{count}"
+                   for edge, count in zip(LAG_BUCKETS_MS, self.counts)]
+        buckets.append(f">{LAG_BUCKETS_MS[-1]}ms:{self.counts[-1]}")
+        return (f"{self.total} beats, worst {self.worst * 1000:.0f}ms, "
+                + " ".join(buckets))
+
+
+# Heartbeat and stall sampler for one Tk root. The heartbeat runs every
+# interval_ms on the Tk thread; the helper thread checks every sample_s and,
+# while a beat is more than threshold_s overdue, logs a stack sample of the
+# Tk thread once per threshold_s, then logs how long the stall lasted when
+# the beats resume. The lag histogram is logged every summary_s and on stop.
+class StallWatchdog(object):
+    def __init__(self, root, log_path, interval_ms=100, threshold_s=0.25,
+                 sample_s=0.05, summary_s=300):
+        self.root = root
+        self.logger = get_logger(log_path)
+        self.interval = interval_ms / 1000
+        self.interval_ms = interval_ms
+        self.threshold = threshold_s
+        self.sample_s = sample_s
+        self.summary_s = summary_s
+        self.histogram = LagHistogram()
+        self.stalls = 0
+        self.main_thread_id = threading.get_ident()
+        self.beat_job = None
+        self.thread = None
+        self.stopping = threading.Event()
+        # Time the last beat ran; read by the helper thread
+        self.last_beat = None
+        self.last_summary = None
+
+    # Start the heartbeat and the helper thread (call from the Tk thread)
+    def start(self):
+        if self.thread is not None:
+            return
+        now = time.perf_counter()
+        self.last_beat = self.last_summary = now
+        self.main_thread_id = threading.get_ident()
+        self.stopping.clear()
+        self.beat_job = self.root.after(self.interval_ms, self.beat)
+        self.thread = threading.Thread(target=self.watch,
+                                       name="stall-watchdog", daemon=True)
+        self.thread.start()
+        self.logger.info("watchdog started: beat every %dms, stall over "
+                         "%.0fms", self.interval_ms, self.threshold * 1000)
+
+    # Stop both and log the lag histogram (before the root is destroyed)
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        if self.beat_job is not None:
+            self.root.after_cancel(self.beat_job)
+            self.beat_job = None
+        self.logger.info("lag %s; %d stalls", self.histogram.summary(),
+                         self.stalls)
+
+    # Heartbeat on the Tk thread: record how late it ran and schedule the
+    # next one
+    def beat(self):
+        now = time.perf_counter()
+        self.histogram.add(max(0.0, now - self.last_beat - self.interval))
+        self.last_beat = now
+        if now - self.last_summary >= self.summary_s:
+            self.last_summary = now
+            self.logger.info("lag %s", self.histogram.summary())
+        self.beat_job = self.root.after(self.interval_ms, self.beat)
+
+    # Helper thread: sample the Tk thread's stack while the heartbeat is
+    # overdue
+    def watch(self):
+        stalled_since = None
+        next_sample = None
+        while not self.stopping.wait(self.sample_s):
+            last_beat = self.last_beat
+            now = time.perf_counter()
+            overdue = now - last_beat - self.interval
+            if stalled_since is not None and stalled_since != last_beat:
+                self.log_stall_end(stalled_since, last_beat)
+                stalled_since = None
+            if overdue > self.threshold:
+                if stalled_since is None:
+                    stalled_since = last_beat
+                    next_sample = now
+                    self.stalls += 1
+                if now >= next_sample:
+                    next_sample = now + self.threshold
+                    self.log_stack(overdue)
+
+    # Log how long a stall lasted, from the beat before it to the one after
+    def log_stall_end(self, stalled_since, resumed):
+        self.logger.warning("event loop stall ended after %.0fms",
+                            (resumed - stalled_since - self.interval) * 1000)
+
+    # Log the Tk thread's current Python stack
+    def log_stack(self, overdue):
+        frame = sys._current_frames().get(self.main_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        self.logger.warning("event loop stalled %.0fms, Tk thread at:\n%s",
+                            overdue * 1000, stack.rstrip())
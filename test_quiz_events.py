@@ -0,0 +1,102 @@
+"""Round-trip tests for the quiz_events log format.
+
+    python -m pytest test_quiz_events.py
+"""
+
+# Import struct to write a version 1 log by hand
+import os
+import struct
+import tempfile
+import unittest
+
+import quiz_events
+from quiz_engine import QuizEngine
+
+
+class EventLogRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "test.qlog")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_every_kind_reads_back(self):
+        log = quiz_events.EventLog(self.path, ["Otago", "Southland"])
+        log.start(4, "mixed")
+        log.reset(2 ** 64 - 1)
+        log.click("Southland")
+        log.question("Otago", 42, ["Ōtākou", "Murihiku", "Tāmaki"])
+        log.answer("Ōtākou", True)
+        log.answer("otakou", True, typed=True)
+        log.answer(None, False)
+        log.close_question()
+        log.close()
+
+        start_time, names, events = quiz_events.read_events(self.path)
+        self.assertEqual(names, ["Otago", "Southland"])
+        self.assertEqual([event.kind for event in events],
+                         [quiz_events.START, quiz_events.RESET,
+                          quiz_events.CLICK, quiz_events.QUESTION,
+                          quiz_events.ANSWER, quiz_events.ANSWER,
+                          quiz_events.ANSWER, quiz_events.CLOSE])
+        start, reset, click, question, answer, typed, missing, _ = events
+        self.assertEqual((start.option_count, start.direction), (4, "mixed"))
+        self.assertEqual(reset.seed, 2 ** 64 - 1)
+        self.assertEqual(click.region, "Southland")
+        self.assertEqual((question.region, question.seed, question.options),
+                         ("Otago", 42, ["Ōtākou", "Murihiku", "Tāmaki"]))
+        self.assertEqual((answer.answer, answer.correct, answer.typed),
+                         ("Ōtākou", True, False))
+        self.assertEqual((typed.answer, typed.typed), ("otakou", True))
+        self.assertEqual((missing.answer, missing.correct), (None, False))
+
+    def test_long_answers_large_decks_and_long_runs(self):
+        names = [f"Region {number}" for number in range(70000)]
+        log = quiz_events.EventLog(self.path, names)
+        # A kiosk started over 49.7 days (2 ** 32 ms) ago
+        log.start_time -= 60 * 24 * 60 * 60
+        log.question("Region 69999", 7, ["a", "b"])
+        log.answer("x" * 70000, False, typed=True)
+        log.close()
+
+        _, _, (question, answer) = quiz_events.read_events(self.path)
+        self.assertEqual(question.region, "Region 69999")
+        self.assertEqual(answer.answer, "x" * 70000)
+
+    def test_version_1_logs_still_read(self):
+        names = "\0".join(["Otago", "Southland"]).encode("utf-8")
+        record = struct.Struct("<BIH")
+        question = struct.pack("<HQ", 1, 9) + b"a\0b"
+        with open(self.path, "wb") as log_file:
+            log_file.write(quiz_events.HEADER.pack(
+                quiz_events.LOG_MAGIC, 1, 1000.0, 2, len(names)) + names)
+            log_file.write(record.pack(quiz_events.START, 0, 1) + b"\x03")
+            log_file.write(record.pack(quiz_events.QUESTION, 1500,
+                                       len(question)) + question)
+
+        _, _, (start, asked) = quiz_events.read_events(self.path)
+        self.assertEqual((start.option_count, start.direction),
+                         (3, "forward"))
+        self.assertEqual((asked.region, asked.seed, asked.options,
+                          asked.time), ("Southland", 9, ["a", "b"], 1001.5))
+
+    def test_engine_session_replays(self):
+        log = quiz_events.EventLog(self.path, list(QuizEngine().regions))
+        engine = QuizEngine(events=log, seed=1, direction="mixed")
+        for region in engine.available_regions()[:5]:
+            options = engine.show_question(region)
+            engine.check_answer(options[0])
+        engine.show_question(engine.available_regions()[0])
+        engine.check_typed_answer("x" * 70000)
+        log.close()
+
+        count, mismatches = quiz_events.replay(
+            quiz_events.read_events(self.path)[2])
+        self.assertEqual(mismatches, [])
+        self.assertEqual(engine.current_region, None)
+        self.assertEqual(len(engine.answered_regions), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()